@@ -2,14 +2,24 @@
 import os
 import discord
 from discord.ext import commands
-from core.config import cfg, cfg_bool
-from core.module_loader import load_all_modules
+from core.config import cfg, cfg_bool, start_watcher
+from core.module_loader import load_all_modules, start_all_modules, shutdown_all_modules
 from core.logging import log
 # ---------------------------------------------------------
 # Bot Setup
 # ---------------------------------------------------------
+class WGGBot(commands.Bot):
+    async def setup_hook(self):
+        # Event loop is running: modules can open sessions / tasks
+        await start_all_modules(self)
+
+    async def close(self):
+        await shutdown_all_modules(self)
+        await super().close()
+
+
 intents = discord.Intents.all()
-bot = commands.Bot(command_prefix="/", intents=intents)
+bot = WGGBot(command_prefix="/", intents=intents)
 
 # ---------------------------------------------------------
 # Discord Events
@@ -33,6 +43,8 @@ if __name__ == "__main__":
     log("===========================================")
     # Load modules BEFORE connecting to Discord
     load_all_modules(bot)
+    # Hot-reload settings.ini instead of needing a container restart
+    start_watcher(float(cfg("wggbot", "watch_interval", "2.0")))
     debug = cfg_bool("wggbot", "debug")
     token = cfg("wggbot", "BETA_DISCORD_TOKEN" if debug else "LIVE_DISCORD_TOKEN")
     bot.run(token)
@@ -1,62 +1,383 @@
 # /app/core/config.py
 
 import os
+import re
+import tempfile
+import threading
 import configparser
-from .logging import log, sublog
+from types import MappingProxyType
+from .logging import log, sublog, configure_logging
 
 BASE = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 INI_PATH = os.path.join(BASE, "settings.ini")
 
+# Defaults for the core [logging] section
+LOGGING_DEFAULTS = {
+    "max_bytes": "10485760",
+    "rotate_hours": "24",
+    "backup_count": "10",
+    "compress": "true",
+    "format": "text",
+}
+
 config = configparser.ConfigParser()
 
+# Every read-modify-write of `config` / settings.ini goes through this lock
+_lock = threading.RLock()
+
+
+def _apply_logging_settings():
+    section = "logging"
+    d = LOGGING_DEFAULTS
+    try:
+        configure_logging(
+            max_bytes=config.getint(section, "max_bytes", fallback=int(d["max_bytes"])),
+            rotate_hours=config.getfloat(section, "rotate_hours", fallback=float(d["rotate_hours"])),
+            backup_count=config.getint(section, "backup_count", fallback=int(d["backup_count"])),
+            compress=config.getboolean(section, "compress", fallback=True),
+            fmt=config.get(section, "format", fallback=d["format"]),
+        )
+    except Exception as e:
+        log(f"[ERR] Invalid [logging] settings: {e}")
+
+
+def _ini_mtime():
+    try:
+        return os.stat(INI_PATH).st_mtime_ns
+    except OSError:
+        return None
+
+
 # Load settings.ini once
 if os.path.exists(INI_PATH):
     try:
         config.read(INI_PATH)
+        _apply_logging_settings()
         log(f"[OK] Loaded settings.ini from {INI_PATH}")
     except Exception as e:
         log(f"[ERR] Failed reading settings.ini: {e}")
 else:
     log(f"[WARN] settings.ini not found at: {INI_PATH}")
 
+_loaded_mtime = _ini_mtime()
+
+# Per-call cfg() tracing is only emitted in debug mode
+DEBUG = config.getboolean("wggbot", "debug", fallback=False)
+
 
 # ============================================================
 # GLOBAL ensure_settings() — used by ALL modules
 # ============================================================
-def ensure_settings(section: str, defaults: dict):
+def ensure_settings(section: str, defaults: dict, types: dict = None):
     """
     Ensures [section] exists in settings.ini and contains all default values.
     Called by modules like:
         ensure_settings("musicplayer", DEFAULTS)
+
+    types optionally pins how keys are parsed into settings() snapshots,
+    e.g. {"available_models": list}. Unlisted keys are inferred.
     """
 
+    if types:
+        with _lock:
+            _types.setdefault(section, {}).update(types)
+            _invalidate(section)
+
     sublog(f"[CFG] Ensuring [{section}]...")
 
     updated = False
 
-    # Ensure section exists
-    if section not in config:
-        config[section] = {}
-        updated = True
-        sublog(f"[CFG]   Added missing section [{section}]")
-
-    # Ensure default keys
-    for key, value in defaults.items():
-        if key not in config[section]:
-            config[section][key] = value
+    with _lock:
+        # Ensure section exists
+        if section not in config:
+            config[section] = {}
             updated = True
-            sublog(f"[CFG]   Inserted default {key} = {value}")
+            sublog(f"[CFG]   Added missing section [{section}]")
+
+        # Ensure default keys
+        for key, value in defaults.items():
+            if key not in config[section]:
+                config[section][key] = value
+                updated = True
+                sublog(f"[CFG]   Inserted default {key} = {value}")
+
+        # Save file if updated
+        if updated:
+            try:
+                _save()
+                _invalidate(section)
+                sublog(f"[CFG]   Saved updated settings.ini")
+            except Exception as e:
+                sublog(f"[ERR]   Failed writing settings.ini: {e}")
+
+    sublog(f"[CFG] [{section}] ensured.")
+
+# ============================================================
+# Typed settings snapshots
+# ============================================================
+_BOOLS = {"true": True, "yes": True, "on": True,
+          "false": False, "no": False, "off": False}
+_INT_RE = re.compile(r"^[+-]?\d+$")
+_FLOAT_RE = re.compile(r"^[+-]?(\d+\.\d*|\.\d+)$")
+
+_types = {}          # section -> {key: type}
+_snapshots = {}      # section -> Settings
+
+
+class Settings:
+    """
+    Immutable, pre-parsed view of one settings.ini section.
+    Values are exposed as attributes (settings("ollama").ollama_host)
+    or mapping-style via get()/[].
+    """
+
+    __slots__ = ("_section", "_values")
+
+    def __init__(self, section, values):
+        object.__setattr__(self, "_section", section)
+        object.__setattr__(self, "_values", MappingProxyType(values))
+
+    def __getattr__(self, key):
+        try:
+            return self._values[key]
+        except KeyError:
+            raise AttributeError(f"[{self._section}] has no setting {key!r}") from None
+
+    def __setattr__(self, key, value):
+        raise AttributeError("settings snapshots are read-only")
+
+    def __getitem__(self, key):
+        return self._values[key]
+
+    def __contains__(self, key):
+        return key in self._values
+
+    def get(self, key, fallback=None):
+        return self._values.get(key, fallback)
+
+    def __repr__(self):
+        return f"<Settings [{self._section}] {dict(self._values)!r}>"
+
+
+def _parse_value(raw, kind=None):
+    if kind is list or kind is tuple:
+        return tuple(v.strip() for v in raw.split(",") if v.strip())
+    if kind is bool:
+        return _BOOLS.get(raw.strip().lower(), False)
+    if kind is not None:
+        return kind(raw)
+
+    text = raw.strip()
+    lowered = text.lower()
+    if lowered in _BOOLS:
+        return _BOOLS[lowered]
+    if _INT_RE.match(text):
+        return int(text)
+    if _FLOAT_RE.match(text):
+        return float(text)
+    return raw
+
+
+def _build_snapshot(section):
+    kinds = _types.get(section, {})
+    values = {}
+    if config.has_section(section):
+        for key, raw in config.items(section, raw=True):
+            try:
+                values[key] = _parse_value(raw, kinds.get(key))
+            except Exception as e:
+                sublog(f"[ERR] Bad value for {section}.{key} ({raw!r}): {e}")
+                values[key] = raw
+    return Settings(section, values)
+
+
+def _invalidate(section=None):
+    if section is None:
+        _snapshots.clear()
+    else:
+        _snapshots.pop(section, None)
+
+
+def settings(section: str) -> Settings:
+    """
+    Returns the cached typed snapshot for [section].
+    Built once and rebuilt only after the section changes.
+    """
+    snap = _snapshots.get(section)
+    if snap is None:
+        with _lock:
+            snap = _build_snapshot(section)
+            _snapshots[section] = snap
+        if DEBUG:
+            sublog(f"[CFG] Built snapshot for [{section}]")
+    return snap
+
+
+# ============================================================
+# Persistence — atomic write-to-temp + rename
+# ============================================================
+def _save():
+    """Write `config` to settings.ini atomically. Caller holds _lock."""
+    global _loaded_mtime
 
-    # Save file if updated
-    if updated:
+    folder = os.path.dirname(INI_PATH)
+    fd, tmp = tempfile.mkstemp(prefix=".settings.", suffix=".tmp", dir=folder)
+    try:
+        with os.fdopen(fd, "w") as f:
+            config.write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(INI_PATH):
+            os.chmod(tmp, os.stat(INI_PATH).st_mode & 0o777)
+        os.replace(tmp, INI_PATH)
+    except Exception:
         try:
-            with open(INI_PATH, "w") as f:
-                config.write(f)
-            sublog(f"[CFG]   Saved updated settings.ini")
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+    # Our own write must not look like an external edit to the watcher
+    _loaded_mtime = _ini_mtime()
+
+
+def set_values(section: str, values: dict):
+    """
+    Updates keys in [section], persists settings.ini atomically and
+    notifies subscribers. Values are stored as strings.
+    """
+    with _lock:
+        if section not in config:
+            config[section] = {}
+        changed = False
+        for key, value in values.items():
+            value = str(value)
+            if config[section].get(key) != value:
+                config[section][key] = value
+                changed = True
+        if not changed:
+            return
+        _save()
+        _invalidate(section)
+
+    sublog(f"[CFG] Saved [{section}] {', '.join(values)}")
+    _notify([section])
+
+
+def set_value(section: str, key: str, value):
+    set_values(section, {key: value})
+
+
+# ============================================================
+# Subscriptions + hot reload
+# ============================================================
+_subscribers = {}    # section -> [callback(section, Settings)]
+
+
+def subscribe(section: str, callback):
+    """
+    Calls callback(section, snapshot) whenever [section] changes.
+    Callbacks run on the watcher thread; asyncio code should hop back
+    with loop.call_soon_threadsafe().
+    """
+    with _lock:
+        _subscribers.setdefault(section, []).append(callback)
+
+
+def _notify(sections):
+    for section in sections:
+        for callback in list(_subscribers.get(section, ())):
+            try:
+                callback(section, settings(section))
+            except Exception as e:
+                log(f"[ERR] settings subscriber for [{section}] failed: {e}")
+
+
+def reload():
+    """
+    Re-reads settings.ini and applies changed sections in place.
+    Returns the list of sections that changed.
+    """
+    global _loaded_mtime, DEBUG
+
+    with _lock:
+        mtime = _ini_mtime()
+        fresh = configparser.ConfigParser()
+        try:
+            # A missing or half-saved file must not read as "every
+            # section deleted"; the next set_value() would persist that.
+            if mtime is None:
+                raise OSError("file not found")
+            if not os.path.getsize(INI_PATH):
+                raise ValueError("file is empty")
+            with open(INI_PATH) as f:
+                fresh.read_file(f)
+        except (OSError, ValueError, configparser.Error) as e:
+            # Remember the mtime so a bad file is reported once, not every poll
+            _loaded_mtime = mtime
+            log(f"[WARN] Not reloading settings.ini ({e}); keeping current settings")
+            return []
+
+        changed = []
+        for section in set(config.sections()) | set(fresh.sections()):
+            old = dict(config[section]) if config.has_section(section) else None
+            new = dict(fresh[section]) if fresh.has_section(section) else None
+            if old == new:
+                continue
+            changed.append(section)
+            if new is None:
+                config.remove_section(section)
+            else:
+                if not config.has_section(section):
+                    config.add_section(section)
+                for key in set(old or ()) - set(new):
+                    config.remove_option(section, key)
+                for key, value in new.items():
+                    config.set(section, key, value)
+            _invalidate(section)
+
+        _loaded_mtime = mtime
+
+        if "wggbot" in changed:
+            DEBUG = config.getboolean("wggbot", "debug", fallback=False)
+        if "logging" in changed:
+            _apply_logging_settings()
+
+    if changed:
+        log(f"[CFG] Reloaded settings.ini ({', '.join(sorted(changed))})")
+        _notify(changed)
+    return changed
+
+
+_watcher = None
+_watcher_stop = threading.Event()
+
+
+def _watch_loop(interval):
+    while not _watcher_stop.wait(interval):
+        try:
+            if _ini_mtime() != _loaded_mtime:
+                reload()
         except Exception as e:
-            sublog(f"[ERR]   Failed writing settings.ini: {e}")
+            log(f"[ERR] settings.ini watcher: {e}")
+
+
+def start_watcher(interval: float = 2.0):
+    """Polls settings.ini's mtime in a daemon thread and hot-reloads it."""
+    global _watcher
+    if _watcher and _watcher.is_alive():
+        return
+    _watcher_stop.clear()
+    _watcher = threading.Thread(
+        target=_watch_loop, args=(interval,), name="wggbot-config-watcher", daemon=True
+    )
+    _watcher.start()
+    log(f"[CFG] Watching settings.ini every {interval}s")
+
+
+def stop_watcher():
+    _watcher_stop.set()
 
-    sublog(f"[CFG] [{section}] ensured.")
 
 # ============================================================
 # Access helpers
@@ -64,8 +385,10 @@ def ensure_settings(section: str, defaults: dict):
 
 def cfg(section, key, fallback=None):
     try:
-        value = config.get(section, key, fallback=fallback)
-        sublog(f"[CFG] {section}.{key} = {value}")
+        with _lock:
+            value = config.get(section, key, fallback=fallback)
+        if DEBUG:
+            sublog(f"[CFG] {section}.{key} = {value}")
         return value
     except Exception as e:
         sublog(f"[ERR] cfg() failed for {section}.{key}: {e}")
@@ -74,8 +397,10 @@ def cfg(section, key, fallback=None):
 
 def cfg_bool(section, key, fallback=False):
     try:
-        value = config.getboolean(section, key, fallback=fallback)
-        sublog(f"[CFG] {section}.{key} (bool) = {value}")
+        with _lock:
+            value = config.getboolean(section, key, fallback=fallback)
+        if DEBUG:
+            sublog(f"[CFG] {section}.{key} (bool) = {value}")
         return value
     except Exception as e:
         sublog(f"[ERR] cfg_bool() failed for {section}.{key}: {e}")
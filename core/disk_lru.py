@@ -0,0 +1,81 @@
+# /app/core/disk_lru.py
+import os
+from collections import OrderedDict
+
+
+# ============================================================
+# DiskLRU — base for on-disk caches
+#   key → <folder>/<key><suffix>
+#   - LRU order is file mtime, so it survives restarts;
+#     subclasses os.utime() a file when it is used
+#   - `<suffix>.part` files are interrupted writes and are
+#     removed when the folder is indexed
+#   - evicts least recently used files over max_bytes
+# Subclasses own reading and writing the files themselves.
+# ============================================================
+class DiskLRU:
+
+    suffix = ""
+
+    def __init__(self, folder="", enabled=False, max_bytes=0):
+        self.folder = folder
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+
+        self._files = OrderedDict()     # key -> size, least recently used first
+        self._bytes = 0
+        self.evicted = 0
+
+    def path_for(self, key):
+        return os.path.join(self.folder, f"{key}{self.suffix}")
+
+    def open(self) -> bool:
+        """Indexes existing files, oldest first, and trims to the budget."""
+        self._files.clear()
+        self._bytes = 0
+        if not self.enabled or not self.folder:
+            return False
+
+        os.makedirs(self.folder, exist_ok=True)
+        found = []
+        for entry in os.scandir(self.folder):
+            if entry.name.endswith(self.suffix + ".part"):
+                self._remove(entry.path)
+            elif entry.name.endswith(self.suffix):
+                st = entry.stat()
+                found.append((st.st_mtime, entry.name[:-len(self.suffix)], st.st_size))
+
+        for _, key, size in sorted(found):
+            self._files[key] = size
+            self._bytes += size
+
+        self._evict()
+        return True
+
+    # -------------------------------
+    # Index bookkeeping
+    # -------------------------------
+    def _add(self, key, size):
+        self._files[key] = size
+        self._bytes += size
+        self._evict()
+
+    def _drop(self, key):
+        self._bytes -= self._files.pop(key, 0)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def _evict(self):
+        for key in list(self._files):
+            if self._bytes <= self.max_bytes:
+                break
+            # A file that is still open (Windows) is skipped this round
+            if self._remove(self.path_for(key)):
+                self._drop(key)
+                self.evicted += 1
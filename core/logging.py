@@ -1,32 +1,57 @@
 # /app/core/logging.py
 import os
-import inspect
+import sys
+import gzip
+import json
+import time
+import queue
+import atexit
+import shutil
+import threading
 from datetime import datetime
 
 LOG_DIR = "logs"
 
-# --- Clear logs on startup ---
-if not os.path.exists(LOG_DIR):
-    os.makedirs(LOG_DIR, exist_ok=True)
-else:
-    for file in os.listdir(LOG_DIR):
-        if file.endswith(".log"):
-            try:
-                os.remove(os.path.join(LOG_DIR, file))
-            except:
-                pass
+# How often the writer thread flushes open handles (seconds)
+FLUSH_INTERVAL = 0.5
+
+# Max entries the writer drains per wake-up before writing
+BATCH_MAX = 512
+
+# Rotation / output settings (overridden from [logging] via configure_logging)
+MAX_BYTES = 10 * 1024 * 1024     # rotate when a file grows past this (0 = off)
+ROTATE_HOURS = 24                # rotate when a file is older than this (0 = off)
+BACKUP_COUNT = 10                # archives kept per log file
+COMPRESS = True                  # gzip rotated archives
+FORMAT = "text"                  # "text" or "json" (JSON lines)
+
+os.makedirs(LOG_DIR, exist_ok=True)
+
+
+def configure_logging(*, max_bytes=None, rotate_hours=None, backup_count=None,
+                      compress=None, fmt=None):
+    """Apply [logging] settings. Called by core.config once settings.ini is read."""
+    global MAX_BYTES, ROTATE_HOURS, BACKUP_COUNT, COMPRESS, FORMAT
+    if max_bytes is not None:
+        MAX_BYTES = max(0, int(max_bytes))
+    if rotate_hours is not None:
+        ROTATE_HOURS = max(0.0, float(rotate_hours))
+    if backup_count is not None:
+        BACKUP_COUNT = max(0, int(backup_count))
+    if compress is not None:
+        COMPRESS = bool(compress)
+    if fmt is not None:
+        FORMAT = "json" if str(fmt).strip().lower() in ("json", "jsonl") else "text"
 
 
 # -------------------------------------------------
 # Determine correct log file name based on rules
 # -------------------------------------------------
-def _get_module_log_name(frame):
-    module = inspect.getmodule(frame)
-
-    if not module or not hasattr(module, "__file__"):
+def _get_module_log_name(path):
+    if not path:
         return "unknown"
 
-    path = module.__file__.replace("\\", "/")
+    path = path.replace("\\", "/")
 
     # Everything should be under "app/"
     if "app/" not in path:
@@ -62,43 +87,240 @@ def _get_module_log_name(frame):
 
 
 # -------------------------------------------------
-# Get the filename for extra `[file.py]` tag
+# Resolve (log name, `[file.py]` tag) for a caller frame.
+# Cached per source file so each caller pays one dict lookup.
 # -------------------------------------------------
-def _get_source_filename(frame):
-    module = inspect.getmodule(frame)
-    if not module or not hasattr(module, "__file__"):
-        return "unknown"
-    return os.path.basename(module.__file__)
+_name_cache = {}
+
+
+def _resolve_caller(frame):
+    path = frame.f_globals.get("__file__")
+    cached = _name_cache.get(path)
+    if cached is None:
+        filename = os.path.basename(path) if path else "unknown"
+        cached = (_get_module_log_name(path), filename)
+        _name_cache[path] = cached
+    return cached
+
+
+# -------------------------------------------------
+# Level detection from the [TAG] conventions used across modules
+# -------------------------------------------------
+def _infer_level(message):
+    upper = message.upper()
+    if "[ERR" in upper or " ERROR" in upper or "EXCEPTION" in upper:
+        return "error"
+    if "[WARN" in upper or " WARN" in upper:
+        return "warning"
+    return "info"
 
 
 # -------------------------------------------------
-# Write the log entry with timestamp + file tag
+# Rotation
 # -------------------------------------------------
-def _write_log(module_name: str, message: str, print_console: bool, frame):
-    filename = _get_source_filename(frame)
-    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+class _LogFile:
+    __slots__ = ("path", "handle", "opened_at", "size")
+
+    def __init__(self, path):
+        self.path = path
+        self.handle = open(path, "a", encoding="utf-8")
+        self.opened_at = time.time()
+        self.size = self.handle.tell()
+
+    def due(self):
+        if MAX_BYTES and self.size >= MAX_BYTES:
+            return True
+        if ROTATE_HOURS and time.time() - self.opened_at >= ROTATE_HOURS * 3600:
+            return True
+        return False
+
+
+def _archive(path):
+    """Move a live log aside as <name>.<stamp><ext>[.gz] and prune old archives."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+
+    base, ext = os.path.splitext(path)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    target = f"{base}.{stamp}{ext}"
+    n = 1
+    while os.path.exists(target) or os.path.exists(target + ".gz"):
+        target = f"{base}.{stamp}-{n}{ext}"
+        n += 1
+
+    try:
+        os.replace(path, target)
+        if COMPRESS:
+            with open(target, "rb") as src, gzip.open(target + ".gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(target)
+    except Exception as e:
+        print(f"[logging] rotate failed for {path}: {e}")
+
+    _prune(base, ext)
+
+
+def _prune(base, ext):
+    folder, name = os.path.split(base)
+    prefix = f"{name}."
+    archives = [
+        os.path.join(folder, f) for f in os.listdir(folder or ".")
+        if f.startswith(prefix)
+        and (f.endswith(ext) or f.endswith(ext + ".gz"))
+        and f != name + ext
+    ]
+    # Oldest first by modification time
+    archives.sort(key=lambda f: os.stat(f).st_mtime_ns)
+    for old in archives[:max(0, len(archives) - BACKUP_COUNT)]:
+        try:
+            os.remove(old)
+        except Exception:
+            pass
+
+
+# -------------------------------------------------
+# Background writer
+# -------------------------------------------------
+_queue = queue.SimpleQueue()
+_STOP = object()
+_handles = {}
+
 
-    final_text = f"[{ts}] [{filename}] {message}"
+def _get_handle(module_name):
+    logfile = _handles.get(module_name)
+    if logfile is None:
+        ext = ".jsonl" if FORMAT == "json" else ".log"
+        path = os.path.join(LOG_DIR, f"{module_name}{ext}")
+        # Archive the previous run's file instead of deleting it
+        _archive(path)
+        logfile = _LogFile(path)
+        _handles[module_name] = logfile
+    elif logfile.due():
+        logfile.handle.close()
+        _archive(logfile.path)
+        logfile = _LogFile(logfile.path)
+        _handles[module_name] = logfile
+    return logfile
+
+
+def _flush_handles():
+    for logfile in _handles.values():
+        try:
+            logfile.handle.flush()
+        except Exception:
+            pass
+
+
+def _close_handles():
+    for logfile in _handles.values():
+        try:
+            logfile.handle.close()
+        except Exception:
+            pass
+    _handles.clear()
+
+
+def _format(record):
+    module_name, ts, filename, message, level, guild_id = record
+    if FORMAT == "json":
+        return json.dumps({
+            "ts": ts.isoformat(timespec="milliseconds"),
+            "module": module_name,
+            "source": filename,
+            "level": level or _infer_level(message),
+            "guild_id": guild_id,
+            "msg": message.strip(),
+        }, ensure_ascii=False) + "\n"
+    return f"[{ts.strftime('%Y-%m-%d %H:%M:%S')}] [{filename}] {message}\n"
+
+
+def _write_batch(batch):
+    for record in batch:
+        module_name = record[0]
+        try:
+            line = _format(record)
+            logfile = _get_handle(module_name)
+            logfile.handle.write(line)
+            logfile.size += len(line)
+        except Exception as e:
+            print(f"[logging] write failed for {module_name}: {e}")
+
+
+def _writer_loop():
+    last_flush = time.monotonic()
+
+    while True:
+        try:
+            item = _queue.get(timeout=FLUSH_INTERVAL)
+        except queue.Empty:
+            _flush_handles()
+            last_flush = time.monotonic()
+            continue
+
+        batch = []
+        stopping = item is _STOP
+        if not stopping:
+            batch.append(item)
+
+        # Drain whatever else is already waiting
+        while not stopping and len(batch) < BATCH_MAX:
+            try:
+                item = _queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stopping = True
+                break
+            batch.append(item)
+
+        _write_batch(batch)
+
+        if stopping:
+            break
+
+        now = time.monotonic()
+        if now - last_flush >= FLUSH_INTERVAL:
+            _flush_handles()
+            last_flush = now
+
+    _close_handles()
+
+
+_writer = threading.Thread(target=_writer_loop, name="wggbot-log-writer", daemon=True)
+_writer.start()
+
+
+def shutdown_logging(timeout: float = 5.0):
+    """Flush everything still queued and close all log files."""
+    if not _writer.is_alive():
+        return
+    _queue.put(_STOP)
+    _writer.join(timeout)
+
+
+atexit.register(shutdown_logging)
+
+
+# -------------------------------------------------
+# Enqueue the raw entry; formatting happens on the writer thread
+# -------------------------------------------------
+def _write_log(message: str, print_console: bool, frame, level, guild_id):
+    module_name, filename = _resolve_caller(frame)
 
     if print_console:
         print(message)
 
-    logfile = os.path.join(LOG_DIR, f"{module_name}.log")
-    with open(logfile, "a", encoding="utf-8") as f:
-        f.write(final_text + "\n")
+    _queue.put((module_name, datetime.now(), filename, message, level, guild_id))
 
 
 # -------------------------------------------------
 # PUBLIC LOGGING FUNCTIONS
+# level/guild_id are optional and only surface in JSON output;
+# level defaults to one inferred from [ERR]/[WARN] style tags.
 # -------------------------------------------------
-def log(message: str, *, print_console: bool = True):
-    frame = inspect.stack()[1].frame
-    module_name = _get_module_log_name(frame)
-    _write_log(module_name, message, print_console, frame)
+def log(message: str, *, print_console: bool = True, level: str = None, guild_id=None):
+    _write_log(message, print_console, sys._getframe(1), level, guild_id)
 
 
-def sublog(message: str, *, print_console: bool = True):
-    frame = inspect.stack()[1].frame
-    module_name = _get_module_log_name(frame)
-    indented = f"   {message}"
-    _write_log(module_name, indented, print_console, frame)
+def sublog(message: str, *, print_console: bool = True, level: str = None, guild_id=None):
+    _write_log(f"   {message}", print_console, sys._getframe(1), level, guild_id)
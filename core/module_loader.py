@@ -5,6 +5,13 @@ import traceback
 from .logging import log, sublog
 
 
+# Async lifecycle hooks collected while loading:
+#   async def start(bot)     → awaited from bot.setup_hook (event loop running)
+#   async def shutdown(bot)  → awaited from bot.close, in reverse order
+_start_hooks = []
+_shutdown_hooks = []
+
+
 def load_all_modules(bot):
 
     BASE_DIR = os.path.abspath(
@@ -105,6 +112,14 @@ def load_all_modules(bot):
                     sublog(f"[{name}] setup() failed")
                     traceback.print_exc()
 
+            # ------------------------
+            # START / SHUTDOWN (async, run later)
+            # ------------------------
+            if hasattr(mod, "start"):
+                _start_hooks.append((import_target, mod.start))
+            if hasattr(mod, "shutdown"):
+                _shutdown_hooks.append((import_target, mod.shutdown))
+
         sublog(f"[{name}] Initialized!")
         log("")
 
@@ -113,3 +128,26 @@ def load_all_modules(bot):
     log("===========================================")
     log("        WGGBot Modules Loaded")
     log("===========================================")
+
+
+async def start_all_modules(bot):
+    for target, hook in _start_hooks:
+        try:
+            await hook(bot)
+            sublog(f"[{target}] start()")
+        except Exception:
+            sublog(f"[{target}] start() failed")
+            traceback.print_exc()
+
+
+async def shutdown_all_modules(bot):
+    hooks = list(reversed(_shutdown_hooks))
+    _shutdown_hooks.clear()
+
+    for target, hook in hooks:
+        try:
+            await hook(bot)
+            sublog(f"[{target}] shutdown()")
+        except Exception:
+            sublog(f"[{target}] shutdown() failed")
+            traceback.print_exc()
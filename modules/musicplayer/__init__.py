@@ -6,9 +6,26 @@ from core.config import ensure_settings
 
 # Default settings for the music player module
 DEFAULTS = {
-    "volume": "50",
+    "volume": "100",                # percent, default for each guild's /volume (new installs)
+    "passthrough": "true",          # at 100%: send Opus as-is, no PCM re-encode
     "autojoin": "true",
-    "max_queue": "25"
+    "max_queue": "25",
+    "extract_workers": "4",         # yt-dlp worker threads
+    "extract_timeout": "30",        # seconds per extraction
+    "cache_db": "data/musicplayer.sqlite",  # track metadata cache (empty = memory only)
+    "meta_ttl_days": "30",
+    "stream_cache_size": "512",     # signed stream URLs kept in memory
+    "prefetch_count": "2",          # upcoming tracks resolved while one plays
+    "warm_source": "true",          # pre-spawn FFmpeg for the next track
+    "warm_seconds": "15",           # ...this long before the current one ends
+    "idle_minutes": "5",            # leave voice + free player state after idling
+    "playlist_page_size": "25",     # flat playlist entries fetched per yt-dlp call
+    "playlist_enrich": "false",     # resolve full metadata for playlist entries
+    "playlist_concurrency": "4",    # ...at most this many at once
+    "audio_cache": "false",         # keep Ogg/Opus copies of often played tracks
+    "audio_cache_dir": "data/audio",
+    "audio_cache_min_plays": "3",   # download after this many plays
+    "audio_cache_max_mb": "1024",   # disk budget, least recently played evicted
 }
 
 
@@ -0,0 +1,156 @@
+# /app/modules/musicplayer/benchmark.py
+#
+# CPU cost per concurrent stream for the two playback paths:
+#   pcm   FFmpegPCMAudio + PCMVolumeTransformer + Opus encode in Python
+#   opus  FFmpegOpusAudio (codec copy / encoded inside FFmpeg)
+#
+# Usage (from the project root):
+#   python -m modules.musicplayer.benchmark <youtube url | file> [--streams 4] [--seconds 30]
+#                                           [--libopus /path/to/libopus.so]
+
+import sys
+import time
+import argparse
+import threading
+import ctypes.util
+
+import discord
+import yt_dlp as youtube_dl
+
+from .musicplayer_base import (
+    FFMPEG_BEFORE,
+    find_ffmpeg,
+    ydl_basic,
+    extract_audio_url,
+)
+
+try:
+    import resource     # Unix only; FFmpeg's own CPU is not reported elsewhere
+except ImportError:
+    resource = None
+
+
+FRAMES_PER_SECOND = 50   # discord.py reads 20 ms frames
+
+
+# ============================================================
+# Source resolution
+# ============================================================
+def resolve(target):
+    """Returns (stream url, codec) for a URL, or (path, None) for a local file."""
+    if "://" not in target:
+        return target, None
+    with youtube_dl.YoutubeDL(ydl_basic()) as ydl:
+        info = ydl.extract_info(target, download=False)
+    return extract_audio_url(info), (info.get("acodec") or "").split(".")[0] or None
+
+
+def make_source(path, stream_url, codec, volume):
+    ffmpeg = find_ffmpeg()
+    before = FFMPEG_BEFORE if "://" in stream_url else None
+
+    if path == "opus":
+        return discord.FFmpegOpusAudio(
+            stream_url, codec="copy" if codec == "opus" else None,
+            executable=ffmpeg, before_options=before, options="-vn",
+        )
+    source = discord.FFmpegPCMAudio(
+        stream_url, executable=ffmpeg, before_options=before, options="-vn",
+    )
+    return discord.PCMVolumeTransformer(source, volume=volume)
+
+
+# ============================================================
+# Measurement
+# ============================================================
+def _consume(source, frames, encode):
+    encoder = discord.opus.Encoder() if encode else None
+    for _ in range(frames):
+        data = source.read()
+        if not data:
+            break
+        if encoder:
+            encoder.encode(data, encoder.SAMPLES_PER_FRAME)
+
+
+def _child_cpu():
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def load_libopus(path=None):
+    """Loads libopus through the public API; returns False if unavailable."""
+    if discord.opus.is_loaded():
+        return True
+    name = path or ctypes.util.find_library("opus")
+    if not name:
+        return False
+    try:
+        discord.opus.load_opus(name)
+    except OSError:
+        return False
+    return discord.opus.is_loaded()
+
+
+def run(path, stream_url, codec, streams, seconds, volume, encode_pcm=True):
+    frames = seconds * FRAMES_PER_SECOND
+    encode = path == "pcm" and encode_pcm
+
+    child_before = _child_cpu()
+    cpu_before = time.process_time()
+    wall_before = time.perf_counter()
+
+    sources = [make_source(path, stream_url, codec, volume) for _ in range(streams)]
+    threads = [threading.Thread(target=_consume, args=(s, frames, encode)) for s in sources]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for s in sources:
+        s.cleanup()     # reaps FFmpeg so its CPU shows up in RUSAGE_CHILDREN
+
+    bot_cpu = time.process_time() - cpu_before
+    ffmpeg_cpu = _child_cpu() - child_before
+    wall = time.perf_counter() - wall_before
+    audio = streams * seconds
+
+    return {
+        "path": path,
+        "bot_cpu_per_stream": bot_cpu / audio,
+        "ffmpeg_cpu_per_stream": ffmpeg_cpu / audio,
+        "wall": wall,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CPU per stream: PCM re-encode vs Opus passthrough")
+    parser.add_argument("target", help="YouTube URL or local audio file")
+    parser.add_argument("--streams", type=int, default=4, help="concurrent streams per path")
+    parser.add_argument("--seconds", type=int, default=30, help="audio seconds read per stream")
+    parser.add_argument("--volume", type=float, default=0.5, help="PCM path volume (0.0-2.0)")
+    parser.add_argument("--libopus", help="libopus to load if discord.py has none loaded")
+    args = parser.parse_args(argv)
+
+    encode_pcm = load_libopus(args.libopus)
+    if not encode_pcm:
+        print("libopus not found (pass --libopus): the PCM path is measured WITHOUT "
+              "the Opus encode discord.py would do, so it under-reports its cost")
+
+    stream_url, codec = resolve(args.target)
+    print(f"Source codec: {codec or 'unknown'}; {args.streams} streams x {args.seconds}s audio")
+    if resource is None:
+        print("(resource module unavailable: FFmpeg CPU not measured)")
+
+    for path in ("pcm", "opus"):
+        r = run(path, stream_url, codec, args.streams, args.seconds, args.volume, encode_pcm)
+        print(
+            f"{r['path']:>5}: bot {r['bot_cpu_per_stream']:.2%} + "
+            f"ffmpeg {r['ffmpeg_cpu_per_stream']:.2%} of one core per stream "
+            f"(read in {r['wall']:.1f}s)"
+        )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
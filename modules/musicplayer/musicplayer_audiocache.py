@@ -0,0 +1,142 @@
+# /app/modules/musicplayer/musicplayer_audiocache.py
+
+import os
+import asyncio
+from collections import OrderedDict
+
+from core.disk_lru import DiskLRU
+from core.logging import log, sublog
+
+
+# ============================================================
+# AudioCache
+#   video id → <dir>/<video id>.ogg (Ogg/Opus)
+#   - tracks are downloaded in the background once they have
+#     been played `min_plays` times
+#   - LRU eviction (file mtime) under a disk budget
+# ============================================================
+class AudioCache(DiskLRU):
+
+    suffix = ".ogg"
+
+    def __init__(self, folder="", enabled=False, min_plays=3, max_bytes=1024 * 1024 * 1024,
+                 bitrate="128k", max_downloads=1, max_tracked=4096):
+        super().__init__(folder, enabled, max_bytes)
+        self.min_plays = min_plays
+        self.bitrate = bitrate
+        self.max_tracked = max_tracked
+
+        self._plays = OrderedDict()     # vid -> play count (not yet cached)
+        self._downloads = {}            # vid -> task
+        self._gate = asyncio.Semaphore(max_downloads)
+
+        self.hits = 0
+        self.misses = 0
+        self.downloaded = 0
+
+    # -------------------------------
+    # Lifecycle
+    # -------------------------------
+    def open(self):
+        if super().open():
+            sublog(f"[audiocache] {len(self._files)} files, {self._bytes / 1048576:.1f} MB in {self.folder}")
+
+    def close(self):
+        for task in self._downloads.values():
+            task.cancel()
+        self._downloads.clear()
+
+    # -------------------------------
+    # Lookup
+    # -------------------------------
+    def has(self, vid) -> bool:
+        return self.enabled and vid in self._files
+
+    def lookup(self, vid):
+        """Returns the cached file path (and marks it recently used) or None."""
+        if not self.enabled or not vid:
+            return None
+
+        if vid not in self._files:
+            self.misses += 1
+            return None
+
+        path = self.path_for(vid)
+        try:
+            os.utime(path)      # LRU order survives restarts
+        except OSError:
+            self._drop(vid)
+            self.misses += 1
+            return None
+
+        self._files.move_to_end(vid)
+        self.hits += 1
+        return path
+
+    # -------------------------------
+    # Play counting + background download
+    # -------------------------------
+    def record_play(self, vid, stream_url, codec, ffmpeg):
+        if not self.enabled or not vid or vid in self._files or vid in self._downloads:
+            return
+
+        plays = self._plays.pop(vid, 0) + 1
+        self._plays[vid] = plays
+        while len(self._plays) > self.max_tracked:
+            self._plays.popitem(last=False)
+
+        if plays >= self.min_plays and stream_url:
+            task = asyncio.ensure_future(self._download(vid, stream_url, codec, ffmpeg))
+            self._downloads[vid] = task
+            task.add_done_callback(lambda _t, v=vid: self._downloads.pop(v, None))
+
+    async def _download(self, vid, stream_url, codec, ffmpeg):
+        final = self.path_for(vid)
+        part = final + ".part"
+        audio = ["-c:a", "copy"] if codec == "opus" else ["-c:a", "libopus", "-b:a", self.bitrate]
+
+        async with self._gate:
+            sublog(f"[audiocache] Downloading {vid}", print_console=False)
+            proc = await asyncio.create_subprocess_exec(
+                ffmpeg, "-nostdin", "-loglevel", "error", "-y",
+                "-reconnect", "1", "-reconnect_streamed", "1", "-reconnect_delay_max", "5",
+                "-i", stream_url, "-vn", "-map_metadata", "-1", *audio, "-f", "ogg", part,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            try:
+                _, err = await proc.communicate()
+            except asyncio.CancelledError:
+                proc.kill()
+                await proc.wait()
+                self._remove(part)
+                raise
+
+        if proc.returncode != 0:
+            log(f"[audiocache] Download failed for {vid}: {err.decode(errors='replace').strip()[:200]}")
+            self._remove(part)
+            return
+
+        os.replace(part, final)
+        size = os.path.getsize(final)
+        self._plays.pop(vid, None)
+        self.downloaded += 1
+        sublog(f"[audiocache] Cached {vid} ({size / 1048576:.1f} MB)", print_console=False)
+        self._add(vid, size)
+
+    # -------------------------------
+    # Stats
+    # -------------------------------
+    def stats(self) -> dict:
+        return {
+            "audio_enabled": self.enabled,
+            "audio_files": len(self._files),
+            "audio_bytes": self._bytes,
+            "audio_max_bytes": self.max_bytes,
+            "audio_hits": self.hits,
+            "audio_misses": self.misses,
+            "audio_downloading": len(self._downloads),
+        }
+
+
+audio_cache = AudioCache()
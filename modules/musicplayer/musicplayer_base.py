@@ -4,12 +4,19 @@ import asyncio
 import re
 import os
 import sys
+import time
 import shutil
+import itertools
+import urllib.parse
+from collections import deque
 import discord
-import yt_dlp as youtube_dl
 from pathlib import Path
 
 from core.logging import log, sublog
+from core.config import settings
+from .musicplayer_extractor import extractor
+from .musicplayer_cache import track_cache, video_id_from_url
+from .musicplayer_audiocache import audio_cache
 
 
 # ============================================================
@@ -17,26 +24,63 @@ from core.logging import log, sublog
 # ============================================================
 COOKIES_FILE = "cookies.txt"
 
+# Stream URLs without an `expire=` parameter are trusted this long (seconds)
+DEFAULT_STREAM_TTL = 1800
 
-# ============================================================
-# State Stores
-# ============================================================
-queues = {}
-currently_playing = {}
-disconnect_requested = {}
-current_song = {}
+# Re-resolve a stream this many seconds before its signed expiry
+STREAM_EXPIRY_MARGIN = 60
+
+# /queue lists at most this many upcoming tracks (Discord's 2000 char cap)
+QUEUE_PREVIEW = 15
 
 
 # ============================================================
-# Queue Helpers
+# Lifecycle
 # ============================================================
-def get_queue(guild_id):
-    if guild_id not in queues:
-        log(f"[queue] Creating new queue for guild {guild_id}")
-        queues[guild_id] = asyncio.Queue()
-    return queues[guild_id]
+def _configure_extractor():
+    mp = settings("musicplayer")
+    extractor.configure(
+        max_workers=mp.get("extract_workers", 4),
+        timeout=mp.get("extract_timeout", 30),
+    )
+
+
+_bot = None
+
+
+def init(bot):
+    global _bot
+    _bot = bot
+    _configure_extractor()
 
+    mp = settings("musicplayer")
+    track_cache.db_path = str(mp.get("cache_db", "") or "")
+    track_cache.meta_ttl = float(mp.get("meta_ttl_days", 30)) * 86400
+    track_cache.stream_size = int(mp.get("stream_cache_size", 512))
+    track_cache.expiry_margin = STREAM_EXPIRY_MARGIN
 
+    audio_cache.enabled = bool(mp.get("audio_cache", False))
+    audio_cache.folder = str(mp.get("audio_cache_dir", "") or "")
+    audio_cache.min_plays = max(1, int(mp.get("audio_cache_min_plays", 3)))
+    audio_cache.max_bytes = int(float(mp.get("audio_cache_max_mb", 1024)) * 1048576)
+
+
+async def start(bot):
+    await track_cache.open()
+    audio_cache.open()
+
+
+async def shutdown(bot):
+    for player in list(players.values()):
+        player.stop()
+    extractor.shutdown()
+    audio_cache.close()
+    await track_cache.close()
+
+
+# ============================================================
+# URL Helpers
+# ============================================================
 def strip_playlist(url: str) -> str:
     """Remove playlist portion to force single-track extraction."""
     cleaned = re.sub(r'(\?|&)list=[^&]*', '', url)
@@ -124,96 +168,538 @@ def find_ffmpeg():
     return "ffmpeg"
 
 
-async def extract_title_artist(url: str):
-    log(f"[meta] Extracting metadata for: {url}")
-    with youtube_dl.YoutubeDL(ydl_basic()) as ydl:
-        info = ydl.extract_info(url, download=False)
-        title = info.get("track") or info.get("title") or "Unknown Title"
-        artist = extract_artist(info)
-        sublog(f"Metadata → {title} — {artist}")
-        return title, artist
+def stream_expiry(stream_url: str):
+    """Unix time a signed googlevideo URL stops working (from `expire=`)."""
+    try:
+        query = urllib.parse.parse_qs(urllib.parse.urlparse(stream_url).query)
+        return float(query["expire"][0])
+    except (KeyError, ValueError, IndexError):
+        return time.time() + DEFAULT_STREAM_TTL
+
+
+# ============================================================
+# Track record — metadata + stream resolved in one pass
+# ============================================================
+class Track:
+    __slots__ = ("url", "title", "artist", "duration", "video_id",
+                 "requester_id", "stream_url", "expires_at", "codec")
+
+    def __init__(self, url, title="Unknown Title", artist="Unknown Artist",
+                 duration=None, video_id=None, requester_id=None,
+                 stream_url=None, expires_at=None, codec=None):
+        self.url = url
+        self.title = title
+        self.artist = artist
+        self.duration = duration
+        self.video_id = video_id
+        self.requester_id = requester_id    # user id, not a Member object
+        self.stream_url = stream_url
+        self.expires_at = expires_at
+        self.codec = codec                  # audio codec of stream_url ("opus", "mp4a", ...)
+
+    @property
+    def requester(self):
+        return f"<@{self.requester_id}>" if self.requester_id else "unknown"
+
+    def stream_valid(self) -> bool:
+        return bool(self.stream_url) and (
+            self.expires_at is None or time.time() < self.expires_at - STREAM_EXPIRY_MARGIN
+        )
+
+    def playable(self) -> bool:
+        """A fresh stream URL or a locally cached file."""
+        return self.stream_valid() or audio_cache.has(self.video_id)
+
+    def apply_info(self, info: dict):
+        self.title = info.get("track") or info.get("title") or self.title
+        self.artist = extract_artist(info)
+        self.duration = info.get("duration") or self.duration
+        self.video_id = info.get("id") or self.video_id
+        self.stream_url = extract_audio_url(info)
+        self.expires_at = stream_expiry(self.stream_url) if self.stream_url else None
+        self.codec = (info.get("acodec") or "").split(".")[0] or None
+
+
+async def _extract_into(track: Track):
+    info = await extractor.extract(track.url, ydl_basic())
+    track.apply_info(info)
+
+    vid = track.video_id
+    await track_cache.put_meta(vid, track.title, track.artist, track.duration)
+    track_cache.put_stream(vid, track.stream_url, track.expires_at, track.codec)
+
+
+async def resolve_track(url: str, requester_id=None) -> Track:
+    """
+    Single yt-dlp pass: metadata and stream URL together.
+    Cached metadata + a still-valid cached stream skip yt-dlp entirely.
+    """
+    vid = video_id_from_url(url)
+    track = Track(url, video_id=vid, requester_id=requester_id)
+
+    meta = await track_cache.get_meta(vid)
+    if meta:
+        track.title, track.artist, track.duration = meta
+        stream = track_cache.get_stream(vid)
+        if stream:
+            track.stream_url, track.expires_at, track.codec = stream
+        sublog(f"[cache] Metadata hit → {track.title} — {track.artist}")
+        return track
+
+    log(f"[meta] Resolving: {url}")
+    await _extract_into(track)
+    sublog(f"Metadata → {track.title} — {track.artist}")
+    return track
+
+
+async def ensure_stream(track: Track) -> bool:
+    """Re-resolves the stream only if it is missing or about to expire."""
+    if track.playable():
+        return True
+
+    stream = track_cache.get_stream(track.video_id)
+    if stream:
+        track.stream_url, track.expires_at, track.codec = stream
+        return True
+
+    sublog(f"[meta] Stream missing/expired, re-resolving {track.title}")
+    await _extract_into(track)
+    return bool(track.stream_url)
+
+
+def cache_stats():
+    stats = track_cache.stats()
+    stats.update(extractor.stats())
+    stats.update(audio_cache.stats())
+    return stats
 
 
 # ============================================================
 # Core Playback
+#   volume 100%  → FFmpegOpusAudio: Opus/WebM streams are remuxed
+#                  (codec copy), anything else is encoded inside
+#                  FFmpeg; nothing is decoded or encoded in Python
+#   otherwise    → FFmpegPCMAudio + PCMVolumeTransformer, which
+#                  allows changing the volume mid-track
+# Tracks in the local audio cache are read from disk (Ogg/Opus).
 # ============================================================
-async def play_audio(vc, url, mention, text_channel, title, artist):
-    log(f"[play] Starting playback for {title} — {artist}")
+FFMPEG_BEFORE = "-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5"
+
 
-    with youtube_dl.YoutubeDL(ydl_basic()) as ydl:
-        info = ydl.extract_info(url, download=False)
-        audio = extract_audio_url(info)
+def default_volume() -> float:
+    return max(0, min(200, int(settings("musicplayer").get("volume", 100)))) / 100
 
-    if not audio:
-        log(f"[ERR] Audio stream missing for {url}")
-        await text_channel.send("❌ Could not find an audio stream.")
-        return
 
+async def build_source(track: Track, volume: float = 1.0):
+    """Spawns FFmpeg for a resolved track (starts buffering immediately)."""
     ffmpeg = find_ffmpeg()
-    opts = {
-        "before_options": "-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5",
-        "options": '-vn -af "volume=0.2"',
-    }
 
-    vc.play(discord.FFmpegPCMAudio(executable=ffmpeg, source=audio, **opts))
-    sublog(f"Playback started via FFmpeg")
+    local = audio_cache.lookup(track.video_id)
+    if local:
+        sublog(f"[audiocache] Playing {track.title} from disk", print_console=False)
+        src, before, codec = local, None, "opus"
+    else:
+        src, before, codec = track.stream_url, FFMPEG_BEFORE, track.codec
+
+    if volume == 1.0 and settings("musicplayer").get("passthrough", True):
+        if codec == "opus":
+            return discord.FFmpegOpusAudio(
+                src, codec="copy", executable=ffmpeg,
+                before_options=before, options="-vn",
+            )
+        if codec is None:
+            # Unknown container: let ffprobe decide between copy and encode
+            return await discord.FFmpegOpusAudio.from_probe(
+                src, executable=ffmpeg,
+                before_options=before, options="-vn",
+            )
+        return discord.FFmpegOpusAudio(
+            src, executable=ffmpeg,
+            before_options=before, options="-vn",
+        )
+
+    source = discord.FFmpegPCMAudio(
+        src, executable=ffmpeg,
+        before_options=before, options="-vn",
+    )
+    return discord.PCMVolumeTransformer(source, volume=volume)
 
 
 # ============================================================
-# Queue Processing
+# Guild Player — all per-guild state in one slotted object.
+# One consumer task per queue, advanced by vc.play(after=...)
+# instead of polling vc.is_playing(). Channels are stored as ids
+# and looked up on use; idle players are evicted.
 # ============================================================
-async def play_next(interaction, queue):
-    guild_id = interaction.guild_id
-
-    if queue.empty():
-        log(f"[queue] Guild {guild_id} queue finished")
-        currently_playing[guild_id] = False
-        current_song[guild_id] = None
-        await interaction.followup.send("Queue finished.")
-        return
-
-    log(f"[queue] Fetching next track for guild {guild_id}")
-
-    channel, url, mention, text_ch, title, artist = await queue.get()
-    current_song[guild_id] = (channel, url, mention, text_ch, title, artist)
+IDLE = "idle"
+RESOLVING = "resolving"
+PLAYING = "playing"
+PAUSED = "paused"
 
-    vc = channel.guild.voice_client or await channel.connect()
-    await play_audio(vc, url, mention, text_ch, title, artist)
+players = {}
 
-    await interaction.followup.send(f"🎶 Now playing **{title}** — {artist}")
 
-    while vc.is_playing():
-        await asyncio.sleep(1)
-
-    log(f"[queue] Finished track: {title}")
-    currently_playing[guild_id] = False
-    current_song[guild_id] = None
-
-    await process_queue(interaction)
+def _cleanup_source(source):
+    try:
+        source.cleanup()
+    except Exception:
+        pass
+
+
+class GuildPlayer:
+    __slots__ = ("guild_id", "queue", "state", "current", "volume",
+                 "voice_channel_id", "text_channel_id", "stopped",
+                 "task", "idle_task", "prefetch_task", "ingest_task", "warm",
+                 "_track_done")
+
+    def __init__(self, guild_id):
+        self.guild_id = guild_id
+        self.queue = deque()
+        self.state = IDLE
+        self.current = None
+        self.volume = default_volume()
+        self.voice_channel_id = None
+        self.text_channel_id = None
+        self.stopped = False
+        self.task = None
+        self.idle_task = None
+        self.prefetch_task = None
+        self.ingest_task = None         # background playlist loader
+        self.warm = None                # (track, source, volume) pre-spawned FFmpeg
+        self._track_done = asyncio.Event()
+
+    # -------------------------------
+    # Queue
+    # -------------------------------
+    @staticmethod
+    def max_queue():
+        return int(settings("musicplayer").get("max_queue", 25))
+
+    def free_slots(self):
+        return max(0, self.max_queue() - len(self.queue))
+
+    def enqueue(self, track: Track) -> bool:
+        if not self.free_slots():
+            return False
+        self.queue.append(track)
+        return True
+
+    def clear(self):
+        self.queue.clear()
+
+    def loading(self):
+        return self.ingest_task is not None and not self.ingest_task.done()
+
+    def bind(self, voice_channel_id, text_channel_id):
+        self.voice_channel_id = voice_channel_id
+        self.text_channel_id = text_channel_id
+        self.stopped = False
+
+    async def notify(self, content):
+        channel = _bot.get_channel(self.text_channel_id) if _bot and self.text_channel_id else None
+        if channel:
+            try:
+                await channel.send(content)
+            except discord.HTTPException:
+                pass
+
+    # -------------------------------
+    # after= bridge (called from discord's audio thread)
+    # -------------------------------
+    def _after(self, loop):
+        def callback(error):
+            if error:
+                log(f"[ERR] Playback error in guild {self.guild_id}: {error}", guild_id=self.guild_id)
+            loop.call_soon_threadsafe(self._track_done.set)
+        return callback
+
+    # -------------------------------
+    # Consumer loop
+    # -------------------------------
+    def ensure_running(self):
+        if self.idle_task and not self.idle_task.done():
+            self.idle_task.cancel()
+        self.idle_task = None
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        log(f"[queue] Player started for guild {self.guild_id}", guild_id=self.guild_id)
+
+        try:
+            while self.queue and not self.stopped:
+                await self._play_one(loop, self.queue.popleft())
+        finally:
+            log(f"[queue] Done processing queue for guild {self.guild_id}", guild_id=self.guild_id)
+            self.cancel_prefetch()
+            self.state = IDLE
+            self.current = None
+            if not self.stopped:
+                self._schedule_idle()
+
+    async def _voice_client(self):
+        guild = _bot.get_guild(self.guild_id)
+        if guild and guild.voice_client:
+            return guild.voice_client
+        channel = _bot.get_channel(self.voice_channel_id)
+        if channel is None:
+            raise RuntimeError("voice channel is gone")
+        return await channel.connect()
+
+    async def _play_one(self, loop, track):
+        log(f"[queue] Playing queued track: {track.title} — {track.artist}", guild_id=self.guild_id)
+
+        self.state = RESOLVING
+        self.current = track
+
+        try:
+            source = self.take_warm_source(track)
+            if source is None:
+                if not await ensure_stream(track):
+                    log(f"[ERR] Audio stream missing for {track.url}", guild_id=self.guild_id)
+                    await self.notify(f"❌ Could not find an audio stream for **{track.title}**.")
+                    return
+                source = await build_source(track, self.volume)
+
+            vc = await self._voice_client()
+
+            self._track_done.clear()
+            vc.play(source, after=self._after(loop))
+            self.state = PLAYING
+            sublog(f"Playback started via FFmpeg", guild_id=self.guild_id)
+            audio_cache.record_play(track.video_id, track.stream_url, track.codec, find_ffmpeg())
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log(f"[ERR] Could not start {track.title}: {e}", guild_id=self.guild_id)
+            await self.notify(f"❌ Could not play **{track.title}**: {e}")
+            return
+
+        self.start_prefetch(track)
+        await self._track_done.wait()
+        log(f"[queue] Finished track: {track.title}", guild_id=self.guild_id)
+
+    # -------------------------------
+    # Idle eviction
+    # -------------------------------
+    def _schedule_idle(self):
+        minutes = float(settings("musicplayer").get("idle_minutes", 5))
+        self.idle_task = asyncio.ensure_future(self._evict_after(minutes * 60))
+
+    async def _evict_after(self, seconds):
+        await asyncio.sleep(seconds)
+        if self.state != IDLE or self.queue:
+            return
+        log(f"[queue] Guild {self.guild_id} idle for {seconds:.0f}s; releasing player", guild_id=self.guild_id)
+        # Unregister before awaiting so a /play during the disconnect
+        # gets a fresh player instead of this one
+        if players.get(self.guild_id) is self:
+            del players[self.guild_id]
+        self.stopped = True
+        guild = _bot.get_guild(self.guild_id) if _bot else None
+        if guild and guild.voice_client:
+            await guild.voice_client.disconnect()
+
+    # -------------------------------
+    # Look-ahead: resolve upcoming streams, warm the next source
+    # -------------------------------
+    def take_warm_source(self, track: Track):
+        """Returns the pre-spawned source if it belongs to `track` at the current volume."""
+        warm, self.warm = self.warm, None
+        if warm is None:
+            return None
+        if warm[0] is track and track.playable():
+            source = warm[1]
+            if isinstance(source, discord.PCMVolumeTransformer) and self.volume != 1.0:
+                source.volume = self.volume
+                return source
+            if warm[2] == self.volume:
+                return source
+        _cleanup_source(warm[1])
+        return None
+
+    def cancel_prefetch(self):
+        if self.prefetch_task and not self.prefetch_task.done():
+            self.prefetch_task.cancel()
+        self.prefetch_task = None
+        if self.warm:
+            _cleanup_source(self.warm[1])
+            self.warm = None
+
+    def start_prefetch(self, current: Track):
+        self.cancel_prefetch()
+        if self.queue:
+            self.prefetch_task = asyncio.ensure_future(self._prefetch(current))
+
+    async def _prefetch(self, current: Track):
+        mp = settings("musicplayer")
+        count = int(mp.get("prefetch_count", 2))
+
+        for track in list(itertools.islice(self.queue, count)):
+            try:
+                await ensure_stream(track)
+                sublog(f"[prefetch] Resolved upcoming: {track.title}", print_console=False, guild_id=self.guild_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log(f"[prefetch] Could not resolve {track.title}: {e}", guild_id=self.guild_id)
+
+        if not mp.get("warm_source", True) or not current.duration:
+            return
+
+        # Spawn FFmpeg for the next track shortly before the current one ends
+        await asyncio.sleep(max(0.0, current.duration - float(mp.get("warm_seconds", 15))))
+
+        if not self.queue:
+            return
+        upcoming = self.queue[0]
+        if upcoming.playable():
+            if self.warm:
+                _cleanup_source(self.warm[1])
+            self.warm = (upcoming, await build_source(upcoming, self.volume), self.volume)
+            sublog(f"[prefetch] Warmed FFmpeg for {upcoming.title}", print_console=False, guild_id=self.guild_id)
+
+    # -------------------------------
+    # Controls
+    # -------------------------------
+    def skip(self, vc):
+        # stop() fires after= → the loop moves on; no second consumer
+        vc.stop()
+
+    def pause(self, vc):
+        if self.state == PLAYING and vc.is_playing():
+            vc.pause()
+            self.state = PAUSED
+            return True
+        return False
+
+    def resume(self, vc):
+        if self.state == PAUSED and vc.is_paused():
+            vc.resume()
+            self.state = PLAYING
+            return True
+        return False
+
+    def set_volume(self, vc, volume: float) -> bool:
+        """
+        Applies now if the current source has a volume transformer.
+        Returns False when the track is on the passthrough path and
+        the change only takes effect from the next track.
+        """
+        self.volume = volume
+        source = vc.source if vc else None
+        if isinstance(source, discord.PCMVolumeTransformer):
+            source.volume = volume
+            return True
+        return source is None
+
+    def stop(self):
+        self.stopped = True
+        self.clear()
+        for task in (self.task, self.idle_task, self.ingest_task):
+            if task and not task.done():
+                task.cancel()
+        self.cancel_prefetch()
+
+
+def get_player(guild_id) -> GuildPlayer:
+    player = players.get(guild_id)
+    if player is None:
+        log(f"[queue] Creating player for guild {guild_id}", guild_id=guild_id)
+        player = GuildPlayer(guild_id)
+        players[guild_id] = player
+    return player
 
 
-async def process_queue(interaction):
-    guild_id = interaction.guild_id
-    queue = get_queue(guild_id)
-    log(f"[queue] Processing queue (size={queue.qsize()})")
+# ============================================================
+# Playlist ingestion — flat pages, enqueued as they arrive
+# ============================================================
+async def _playlist_page(url, start, count):
+    data = await extractor.extract(url, ydl_playlist(f"{start}-{start + count - 1}"))
+    return (data or {}).get("entries") or []
+
+
+def _playlist_track(entry, requester_id):
+    vid = entry.get("id")
+    if not vid:
+        return None
+
+    # Flat entries carry no stream; it is resolved when the track plays
+    return Track(
+        f"https://www.youtube.com/watch?v={vid}",
+        title=entry.get("title") or "Unknown Title",
+        artist=entry.get("uploader") or entry.get("channel") or "Unknown Artist",
+        duration=entry.get("duration"),
+        video_id=vid,
+        requester_id=requester_id,
+    )
 
-    while not queue.empty() and not disconnect_requested.get(guild_id):
-        channel, url, mention, text_ch, title, artist = await queue.get()
 
-        log(f"[queue] Playing queued track: {title} — {artist}")
+async def _enrich(track: Track, gate):
+    """Fills in artist/duration (and a stream) for a flat playlist entry."""
+    async with gate:
+        meta = await track_cache.get_meta(track.video_id)
+        if meta:
+            track.title, track.artist, track.duration = meta
+            return
+        try:
+            await _extract_into(track)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            sublog(f"[playlist] Could not enrich {track.title}: {e}", print_console=False)
 
-        currently_playing[guild_id] = True
-        current_song[guild_id] = (channel, url, mention, text_ch, title, artist)
 
-        vc = channel.guild.voice_client or await channel.connect()
-        await play_audio(vc, url, mention, text_ch, title, artist)
+async def _ingest_playlist(player, url, start, remaining, requester_id):
+    mp = settings("musicplayer")
+    page_size = max(1, int(mp.get("playlist_page_size", 25)))
+    enrich = mp.get("playlist_enrich", False)
+    gate = asyncio.Semaphore(max(1, int(mp.get("playlist_concurrency", 4))))
 
-        while vc.is_playing():
-            await asyncio.sleep(1)
+    pending = set()
+    added = 0
 
-    log(f"[queue] Done processing queue for guild {guild_id}")
-    currently_playing[guild_id] = False
-    current_song[guild_id] = None
+    try:
+        while remaining > 0 and not player.stopped:
+            count = min(page_size, remaining)
+            entries = await _playlist_page(url, start, count)
+
+            for entry in entries:
+                track = _playlist_track(entry, requester_id)
+                if track is None:
+                    continue
+                if not player.enqueue(track):
+                    log(f"[playlist] Queue full; stopped after {added} more tracks", guild_id=player.guild_id)
+                    remaining = 0
+                    break
+
+                added += 1
+                remaining -= 1
+                if enrich:
+                    task = asyncio.ensure_future(_enrich(track, gate))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+
+            # Restarts the consumer if it drained the queue while we were paging
+            player.ensure_running()
+
+            if len(entries) < count:
+                break
+            start += count
+
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    except asyncio.CancelledError:
+        for task in pending:
+            task.cancel()
+        raise
+    except Exception as e:
+        log(f"[ERR] Playlist paging failed at item {start}: {e}", guild_id=player.guild_id)
+    finally:
+        log(f"[playlist] Background load finished ({added} tracks)", guild_id=player.guild_id)
 
 
 # ============================================================
@@ -221,39 +707,45 @@ async def process_queue(interaction):
 # ============================================================
 async def handle_play(interaction, url, msg):
     guild_id = interaction.guild_id
-    queue = get_queue(guild_id)
-    disconnect_requested[guild_id] = False
+    existing = players.get(guild_id)
 
     url = strip_playlist(url)
 
     if not interaction.user.voice:
         return await msg.edit(content="❌ You must be in a voice channel.")
 
+    if existing and not existing.free_slots():
+        return await msg.edit(content=f"❌ The queue is full ({GuildPlayer.max_queue()} tracks).")
+
     channel = interaction.user.voice.channel
-    log(f"[play] User requested: {url} in {channel}")
+    log(f"[play] User requested: {url} in {channel}", guild_id=guild_id)
 
     try:
-        title, artist = await extract_title_artist(url)
+        track = await resolve_track(url, interaction.user.id)
     except Exception as e:
-        log(f"[ERR] Metadata extraction failed: {e}")
+        log(f"[ERR] Metadata extraction failed: {e}", guild_id=guild_id)
         return await msg.edit(content=f"❌ Error: {e}")
 
     await msg.edit(content="Joining voice channel...")
 
-    await queue.put((channel, url, interaction.user.mention, interaction.channel, title, artist))
-    log(f"[queue] Added track to queue: {title}")
+    # Fetched only now: /disconnect or idle eviction may have dropped
+    # the guild's player while we were resolving
+    player = get_player(guild_id)
+    player.bind(channel.id, interaction.channel_id)
+    if not player.enqueue(track):
+        return await msg.edit(content=f"❌ The queue is full ({player.max_queue()} tracks).")
+    log(f"[queue] Added track to queue: {track.title}", guild_id=guild_id)
 
-    if currently_playing.get(guild_id):
-        await msg.edit(content=f"Added **{title}** to the queue.")
+    if player.state != IDLE:
+        await msg.edit(content=f"Added **{track.title}** to the queue.")
     else:
-        await msg.edit(content=f"🎶 Now playing **{title}**")
-        await process_queue(interaction)
+        await msg.edit(content=f"🎶 Now playing **{track.title}**")
+    player.ensure_running()
 
 
 async def handle_playlist(interaction, url, songs, msg):
     guild_id = interaction.guild_id
-    queue = get_queue(guild_id)
-    disconnect_requested[guild_id] = False
+    existing = players.get(guild_id)
 
     if "list=" not in url:
         return await msg.edit(content="❌ This is not a playlist URL.")
@@ -261,107 +753,153 @@ async def handle_playlist(interaction, url, songs, msg):
     if not interaction.user.voice:
         return await msg.edit(content="❌ You must be in a voice channel.")
 
-    log(f"[playlist] Reading playlist: {url} ({songs} tracks)")
-    await msg.edit(content=f"Fetching playlist… first {songs} tracks.")
+    if existing and existing.loading():
+        return await msg.edit(content="⏳ Still loading the previous playlist, try again shortly.")
+
+    if existing and not existing.free_slots():
+        return await msg.edit(content=f"❌ The queue is full ({GuildPlayer.max_queue()} tracks).")
+
+    log(f"[playlist] Reading playlist: {url} ({songs} tracks)", guild_id=guild_id)
 
+    # Only the first entry is fetched up front so playback starts at once
     try:
-        with youtube_dl.YoutubeDL(ydl_playlist(f"1-{songs}")) as ydl:
-            data = ydl.extract_info(url, download=False)
-            entries = data.get("entries") or []
+        entries = await _playlist_page(url, 1, 1)
     except Exception as e:
-        log(f"[ERR] Playlist load failed: {e}")
+        log(f"[ERR] Playlist load failed: {e}", guild_id=guild_id)
         return await msg.edit(content=f"❌ Playlist error: {e}")
 
-    if not entries:
-        log("[playlist] Playlist has no entries")
+    first = _playlist_track(entries[0], interaction.user.id) if entries else None
+    if first is None:
+        log("[playlist] Playlist has no entries", guild_id=guild_id)
         return await msg.edit(content="❌ Playlist is empty.")
 
-    log(f"[playlist] Adding {len(entries)} tracks")
-    songs_to_add = []
-
-    for entry in entries:
-        vid = entry.get("id")
-        if not vid:
-            continue
-
-        song_url = f"https://www.youtube.com/watch?v={vid}"
-        title = entry.get("title", "Unknown Title")
-        artist = entry.get("uploader", "Unknown Artist")
-
-        songs_to_add.append((
-            interaction.user.voice.channel,
-            song_url,
-            interaction.user.mention,
-            interaction.channel,
-            title,
-            artist
-        ))
-
-    for s in songs_to_add:
-        await queue.put(s)
-
-    if currently_playing.get(guild_id):
-        return await msg.edit(content="Playlist added to the queue.")
+    # Fetched only now, as in handle_play; the checks are repeated
+    # because the player may have changed during the first page load
+    player = get_player(guild_id)
+    if player.loading():
+        return await msg.edit(content="⏳ Still loading the previous playlist, try again shortly.")
+
+    songs = min(songs, player.free_slots())
+    if songs <= 0:
+        return await msg.edit(content=f"❌ The queue is full ({player.max_queue()} tracks).")
+
+    player.bind(interaction.user.voice.channel.id, interaction.channel_id)
+    was_idle = player.state == IDLE
+    if not player.enqueue(first):
+        return await msg.edit(content=f"❌ The queue is full ({player.max_queue()} tracks).")
+    player.ensure_running()
+
+    rest = f" Loading up to {songs - 1} more in the background." if songs > 1 else ""
+    if was_idle:
+        await msg.edit(content=f"🎶 Now playing **{first.title}** — {first.artist}.{rest}")
+    else:
+        await msg.edit(content=f"Added **{first.title}** to the queue.{rest}")
 
-    first = songs_to_add[0]
-    await msg.edit(content=f"🎶 Now playing **{first[4]}** — {first[5]}")
-    await process_queue(interaction)
+    if songs > 1:
+        player.ingest_task = asyncio.ensure_future(
+            _ingest_playlist(player, url, 2, songs - 1, interaction.user.id)
+        )
 
 
 async def handle_queue(interaction):
     guild_id = interaction.guild_id
-    queue = get_queue(guild_id)
+    player = players.get(guild_id)
 
-    if queue.empty() and not currently_playing.get(guild_id):
-        log(f"[queue] Queue is empty for guild {guild_id}")
+    if player is None or (not player.queue and player.state == IDLE):
+        log(f"[queue] Queue is empty for guild {guild_id}", guild_id=guild_id)
         return await interaction.followup.send("Queue is empty.")
 
     txt = ""
 
-    if current_song.get(guild_id):
-        _, _, mention, _, title, artist = current_song[guild_id]
-        txt += f"▶️ **Now Playing:** {title} — {artist} (requested by {mention})\n\n"
+    if player.current:
+        track = player.current
+        txt += f"▶️ **Now Playing:** {track.title} — {track.artist} (requested by {track.requester})\n\n"
+
+    items = list(player.queue)
+    for i, track in enumerate(items[:QUEUE_PREVIEW], start=1):
+        txt += f"{i}. {track.title} — {track.artist} (requested by {track.requester})\n"
+    if len(items) > QUEUE_PREVIEW:
+        txt += f"…and {len(items) - QUEUE_PREVIEW} more\n"
 
-    items = list(queue._queue)
-    for i, (_, _, mention, _, title, artist) in enumerate(items, start=1):
-        txt += f"{i}. {title} — {artist} (requested by {mention})\n"
+    if player.loading():
+        txt += "\n⏳ Playlist still loading…\n"
 
-    log(f"[queue] Queried queue ({len(items)} upcoming tracks)")
+    log(f"[queue] Queried queue ({len(items)} upcoming tracks)", guild_id=guild_id)
     await interaction.followup.send(txt)
 
 
 async def handle_disconnect(interaction):
     guild_id = interaction.guild_id
-    queue = get_queue(guild_id)
 
     vc = interaction.guild.voice_client
     if not vc:
-        log(f"[disconnect] Bot not in voice in guild {guild_id}")
+        log(f"[disconnect] Bot not in voice in guild {guild_id}", guild_id=guild_id)
         return await interaction.followup.send("Bot is not in a voice channel.")
 
-    log(f"[disconnect] Disconnecting from guild {guild_id}")
-    disconnect_requested[guild_id] = True
+    log(f"[disconnect] Disconnecting from guild {guild_id}", guild_id=guild_id)
 
+    player = players.pop(guild_id, None)
+    if player:
+        player.stop()
     await vc.disconnect()
 
-    while not queue.empty():
-        queue.get_nowait()
-
-    currently_playing[guild_id] = False
-    current_song[guild_id] = None
-
     await interaction.followup.send("🛑 Disconnected and cleared queue.")
 
 
 async def handle_skip(interaction):
     guild_id = interaction.guild_id
-    queue = get_queue(guild_id)
+    player = players.get(guild_id)
 
     vc = interaction.guild.voice_client
-    if not vc or not vc.is_playing():
-        log(f"[skip] No active playback in guild {guild_id}")
+    if not player or not vc or not (vc.is_playing() or vc.is_paused()):
+        log(f"[skip] No active playback in guild {guild_id}", guild_id=guild_id)
         return await interaction.followup.send("Nothing is currently playing.")
 
-    log(f"[skip] User skipped track")
-    vc.stop()
-    await play_next(interaction, queue)
+    log(f"[skip] User skipped track", guild_id=guild_id)
+    skipped = player.current
+    player.skip(vc)
+
+    if not player.queue:
+        return await interaction.followup.send("⏭️ Skipped. Queue finished.")
+
+    upcoming = player.queue[0]
+    name = f"**{skipped.title}**" if skipped else "track"
+    await interaction.followup.send(f"⏭️ Skipped {name}. Next up: **{upcoming.title}** — {upcoming.artist}")
+
+
+async def handle_pause(interaction):
+    vc = interaction.guild.voice_client
+    player = players.get(interaction.guild_id)
+    if vc and player and player.pause(vc):
+        log(f"[pause] Paused in guild {interaction.guild_id}", guild_id=interaction.guild_id)
+        return await interaction.followup.send("⏸️ Paused.")
+    await interaction.followup.send("Nothing is currently playing.")
+
+
+async def handle_resume(interaction):
+    vc = interaction.guild.voice_client
+    player = players.get(interaction.guild_id)
+    if vc and player and player.resume(vc):
+        log(f"[pause] Resumed in guild {interaction.guild_id}", guild_id=interaction.guild_id)
+        return await interaction.followup.send("▶️ Resumed.")
+    await interaction.followup.send("Nothing is paused.")
+
+
+async def handle_volume(interaction, level):
+    player = players.get(interaction.guild_id)
+
+    if level is None:
+        volume = player.volume if player else default_volume()
+        return await interaction.followup.send(f"🔊 Volume is {round(volume * 100)}%.")
+
+    level = max(0, min(200, level))
+    if player is None:
+        # Keep the level for the next /play, but let it expire like any idle player
+        player = get_player(interaction.guild_id)
+        player._schedule_idle()
+    applied = player.set_volume(interaction.guild.voice_client, level / 100)
+    log(f"[volume] Guild {interaction.guild_id} volume → {level}%", guild_id=interaction.guild_id)
+
+    if applied:
+        return await interaction.followup.send(f"🔊 Volume set to {level}%.")
+    await interaction.followup.send(f"🔊 Volume set to {level}%, starting with the next track.")
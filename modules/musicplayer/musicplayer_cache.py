@@ -0,0 +1,178 @@
+# /app/modules/musicplayer/musicplayer_cache.py
+
+import os
+import re
+import time
+from collections import OrderedDict
+
+from core.logging import log, sublog
+
+
+# ============================================================
+# Video ID parsing
+# ============================================================
+_VIDEO_ID_RE = re.compile(
+    r"(?:youtube\.com/(?:watch\?(?:.*&)?v=|shorts/|embed/|live/)|youtu\.be/)"
+    r"([A-Za-z0-9_-]{11})"
+)
+
+
+def video_id_from_url(url: str):
+    m = _VIDEO_ID_RE.search(url or "")
+    return m.group(1) if m else None
+
+
+# ============================================================
+# TrackCache
+#   metadata: video id → (title, artist, duration)
+#             long TTL, memory LRU in front of SQLite
+#   streams:  video id → (stream url, expires_at, codec)
+#             memory-only LRU, valid until the URL's signed expiry
+# ============================================================
+class TrackCache:
+
+    def __init__(self, db_path="", meta_ttl=30 * 86400, meta_size=2048,
+                 stream_size=512, expiry_margin=60):
+        self.db_path = db_path
+        self.meta_ttl = meta_ttl
+        self.meta_size = meta_size
+        self.stream_size = stream_size
+        self.expiry_margin = expiry_margin
+
+        self._meta = OrderedDict()      # vid -> (title, artist, duration, updated)
+        self._streams = OrderedDict()   # vid -> (url, expires_at, codec)
+        self._db = None
+
+        self.meta_hits = 0
+        self.meta_misses = 0
+        self.stream_hits = 0
+        self.stream_misses = 0
+
+    # -------------------------------
+    # Lifecycle
+    # -------------------------------
+    async def open(self):
+        if not self.db_path:
+            return
+        try:
+            import aiosqlite
+        except ImportError:
+            log("[cache] aiosqlite missing; metadata cache is memory-only")
+            return
+
+        folder = os.path.dirname(self.db_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self._db = await aiosqlite.connect(self.db_path)
+        await self._db.execute(
+            "CREATE TABLE IF NOT EXISTS tracks ("
+            " video_id TEXT PRIMARY KEY, title TEXT, artist TEXT,"
+            " duration INTEGER, updated REAL)"
+        )
+        await self._db.execute(
+            "DELETE FROM tracks WHERE updated < ?", (time.time() - self.meta_ttl,)
+        )
+        await self._db.commit()
+        sublog(f"[cache] Track metadata persisted to {self.db_path}")
+
+    async def close(self):
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+    # -------------------------------
+    # Metadata
+    # -------------------------------
+    def _remember_meta(self, vid, row):
+        self._meta[vid] = row
+        self._meta.move_to_end(vid)
+        while len(self._meta) > self.meta_size:
+            self._meta.popitem(last=False)
+
+    async def get_meta(self, vid):
+        """Returns (title, artist, duration) or None."""
+        if not vid:
+            return None
+        now = time.time()
+
+        row = self._meta.get(vid)
+        if row and now - row[3] < self.meta_ttl:
+            self._meta.move_to_end(vid)
+            self.meta_hits += 1
+            return row[:3]
+
+        if self._db is not None:
+            async with self._db.execute(
+                "SELECT title, artist, duration, updated FROM tracks WHERE video_id = ?", (vid,)
+            ) as cur:
+                row = await cur.fetchone()
+            if row and now - row[3] < self.meta_ttl:
+                self._remember_meta(vid, tuple(row))
+                self.meta_hits += 1
+                return tuple(row[:3])
+
+        self.meta_misses += 1
+        return None
+
+    async def put_meta(self, vid, title, artist, duration):
+        if not vid:
+            return
+        row = (title, artist, duration, time.time())
+        self._remember_meta(vid, row)
+
+        if self._db is not None:
+            await self._db.execute(
+                "INSERT OR REPLACE INTO tracks (video_id, title, artist, duration, updated)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (vid, *row),
+            )
+            await self._db.commit()
+
+    # -------------------------------
+    # Stream URLs
+    # -------------------------------
+    def get_stream(self, vid):
+        """Returns (stream_url, expires_at, codec) if still comfortably valid."""
+        entry = self._streams.get(vid) if vid else None
+        if entry and (entry[1] is None or time.time() < entry[1] - self.expiry_margin):
+            self._streams.move_to_end(vid)
+            self.stream_hits += 1
+            return entry
+        if entry:
+            del self._streams[vid]
+        self.stream_misses += 1
+        return None
+
+    def put_stream(self, vid, stream_url, expires_at, codec=None):
+        if not vid or not stream_url:
+            return
+        self._streams[vid] = (stream_url, expires_at, codec)
+        self._streams.move_to_end(vid)
+        while len(self._streams) > self.stream_size:
+            self._streams.popitem(last=False)
+
+    def drop_stream(self, vid):
+        self._streams.pop(vid, None)
+
+    # -------------------------------
+    # Stats
+    # -------------------------------
+    def stats(self) -> dict:
+        def rate(h, m):
+            return h / (h + m) if (h + m) else 0.0
+
+        return {
+            "meta_hits": self.meta_hits,
+            "meta_misses": self.meta_misses,
+            "meta_hit_rate": rate(self.meta_hits, self.meta_misses),
+            "stream_hits": self.stream_hits,
+            "stream_misses": self.stream_misses,
+            "stream_hit_rate": rate(self.stream_hits, self.stream_misses),
+            "meta_entries": len(self._meta),
+            "stream_entries": len(self._streams),
+            "persistent": self._db is not None,
+        }
+
+
+track_cache = TrackCache()
@@ -9,6 +9,10 @@ from .musicplayer_base import (
     handle_skip,
     handle_queue,
     handle_disconnect,
+    handle_pause,
+    handle_resume,
+    handle_volume,
+    cache_stats,
 )
 print("WHAT THE FUCK")
 # -------------------------------------------------------------
@@ -87,6 +91,66 @@ def register(bot):
         await handle_skip(interaction)
 
 
+    # ==========================================================
+    # /pause
+    # ==========================================================
+    @bot.tree.command(
+        name="pause",
+        description="Pause the currently playing track."
+    )
+    async def pause_cmd(interaction: discord.Interaction):
+
+        if isinstance(interaction.channel, discord.DMChannel):
+            return await interaction.response.send_message(
+                "❌ This command cannot be used in DMs.",
+                ephemeral=True
+            )
+
+        await interaction.response.defer()
+        await handle_pause(interaction)
+
+
+    # ==========================================================
+    # /resume
+    # ==========================================================
+    @bot.tree.command(
+        name="resume",
+        description="Resume a paused track."
+    )
+    async def resume_cmd(interaction: discord.Interaction):
+
+        if isinstance(interaction.channel, discord.DMChannel):
+            return await interaction.response.send_message(
+                "❌ This command cannot be used in DMs.",
+                ephemeral=True
+            )
+
+        await interaction.response.defer()
+        await handle_resume(interaction)
+
+
+    # ==========================================================
+    # /volume
+    # ==========================================================
+    @bot.tree.command(
+        name="volume",
+        description="Show or set the playback volume (0-200%)."
+    )
+    async def volume_cmd(
+        interaction: discord.Interaction,
+        level: app_commands.Range[int, 0, 200] = None
+    ):
+
+        if isinstance(interaction.channel, discord.DMChannel):
+            return await interaction.response.send_message(
+                "❌ This command cannot be used in DMs.",
+                ephemeral=True
+            )
+
+        await interaction.response.defer()
+        await handle_volume(interaction, level)
+
+
     # ==========================================================
     # /queue
     # ==========================================================
@@ -123,3 +187,28 @@ def register(bot):
 
         await interaction.response.defer()
         await handle_disconnect(interaction)
+
+
+    # ==========================================================
+    # /music_cache
+    # ==========================================================
+    @bot.tree.command(
+        name="music_cache",
+        description="Show track metadata / stream cache statistics."
+    )
+    async def music_cache_cmd(interaction: discord.Interaction):
+        st = cache_stats()
+        await interaction.response.send_message(
+            f"🗃️ **Music cache**\n"
+            f"Metadata: {st['meta_hits']} hits / {st['meta_misses']} misses "
+            f"({st['meta_hit_rate']:.0%}), {st['meta_entries']} in memory"
+            f"{', persistent' if st['persistent'] else ''}\n"
+            f"Streams: {st['stream_hits']} hits / {st['stream_misses']} misses "
+            f"({st['stream_hit_rate']:.0%}), {st['stream_entries']} cached\n"
+            f"yt-dlp: {st['started']} extractions, {st['merged']} merged\n"
+            f"Audio files: {st['audio_files']} on disk "
+            f"({st['audio_bytes'] / 1048576:.0f} / {st['audio_max_bytes'] / 1048576:.0f} MB), "
+            f"{st['audio_hits']} hits / {st['audio_misses']} misses"
+            f"{'' if st['audio_enabled'] else ' (disabled)'}",
+            ephemeral=True
+        )
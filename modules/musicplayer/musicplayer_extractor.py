@@ -0,0 +1,121 @@
+# /app/modules/musicplayer/musicplayer_extractor.py
+
+import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import yt_dlp as youtube_dl
+
+from core.logging import log, sublog
+
+
+# ============================================================
+# Worker (runs inside the pool, never on the event loop)
+# ============================================================
+def _extract(url, opts):
+    with youtube_dl.YoutubeDL(opts) as ydl:
+        return ydl.extract_info(url, download=False)
+
+
+# ============================================================
+# ExtractionService
+#   - yt-dlp runs in a bounded thread pool
+#   - per-call timeout; callers can be cancelled independently
+#   - concurrent calls for the same (url, options) share one job
+#   - a job nobody waits on any more is cancelled if it has not
+#     started; a running yt-dlp thread cannot be interrupted, so it
+#     keeps its worker until it returns and is counted as abandoned
+# ============================================================
+class ExtractionService:
+
+    def __init__(self, max_workers=4, timeout=30.0):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._executor = None
+        self._inflight = {}     # key -> [job, future, waiters]
+        self._abandoned = 0     # workers still busy with jobs nobody awaits
+
+        self.started = 0
+        self.merged = 0
+
+    def configure(self, max_workers=None, timeout=None):
+        if timeout is not None:
+            self.timeout = float(timeout)
+        if max_workers is not None and int(max_workers) != self.max_workers:
+            self.max_workers = max(1, int(max_workers))
+            # New size applies to the next pool; running jobs finish on the old one
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="yt-dlp"
+            )
+        return self._executor
+
+    async def extract(self, url: str, opts: dict, timeout: float = None) -> dict:
+        key = (url, json.dumps(opts, sort_keys=True, default=str))
+        entry = self._inflight.get(key)
+
+        if entry is None:
+            if self._abandoned >= self.max_workers:
+                raise RuntimeError("All yt-dlp workers are stuck on timed-out extractions; try again shortly")
+
+            job = self._pool().submit(_extract, url, opts)
+            entry = [job, asyncio.wrap_future(job), 0]
+            self._inflight[key] = entry
+            entry[1].add_done_callback(lambda _f, k=key, e=entry: self._forget(k, e))
+            self.started += 1
+        else:
+            self.merged += 1
+            sublog(f"[extract] Joined in-flight extraction for {url}", print_console=False)
+
+        future = entry[1]
+        entry[2] += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            log(f"[extract] Timed out after {timeout or self.timeout}s: {url}")
+            raise TimeoutError(f"yt-dlp timed out for {url}") from None
+        finally:
+            entry[2] -= 1
+            if entry[2] == 0 and not future.done():
+                self._abandon(key, entry)
+
+    def _forget(self, key, entry):
+        if self._inflight.get(key) is entry:
+            del self._inflight[key]
+
+    def _abandon(self, key, entry):
+        job, future = entry[0], entry[1]
+        self._forget(key, entry)
+        # Nobody will read the result; keep asyncio from warning about it
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+        if job.cancel():
+            return      # never started; the worker was not used
+
+        loop = asyncio.get_running_loop()
+        self._abandoned += 1
+        job.add_done_callback(lambda _j: loop.call_soon_threadsafe(self._release_abandoned))
+
+    def _release_abandoned(self):
+        self._abandoned -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "started": self.started,
+            "merged": self.merged,
+            "inflight": len(self._inflight),
+            "abandoned": self._abandoned,
+        }
+
+
+extractor = ExtractionService()
@@ -1,68 +1,44 @@
 # /app/modules/ollama/__init__.py
 
-import requests
-from core.logging import sublog
-from core.config import ensure_settings, cfg
-import configparser
-import os
+from core.config import ensure_settings
 
 
 # Default settings for the Ollama module
 DEFAULTS = {
     "ollama_host": "http://localhost:11434",
+    "ollama_hosts": "",             # comma-separated pool; empty → ollama_host only
+    "health_interval": "30",        # seconds between /api/tags health checks
     "default_model": "llama3.1:latest",
-    "available_models": ""          # populated dynamically on init
+    "available_models": "",         # populated dynamically on init
+    "max_connections": "8",         # pooled connections per Ollama host
+    "connect_timeout": "5",
+    "request_timeout": "30",
+    "keepalive_timeout": "60",
+    "stream": "true",               # stream tokens into the reply as they arrive
+    "stream_edit_interval": "1.0",  # min seconds between message edits
+    "cache_enabled": "false",       # opt-in response cache; with memory on, only a
+                                    # conversation's first turn can be served from it
+    "cache_mode": "deterministic",  # deterministic (seed / temperature 0) | all
+    "cache_ttl": "3600",
+    "cache_max_entries": "256",
+    "cache_max_bytes": "4000000",
+    "cache_db": "",                 # e.g. data/ollama_cache.sqlite to persist
+    "cache_db_max_bytes": "64000000",  # SQLite tier budget (reply text), oldest pruned
+    "max_inflight_per_model": "1",  # concurrent generations per model, per host serving it
+    "max_inflight_per_host": "2",   # concurrent generations per Ollama host
+    "max_loaded_models": "1",       # models the host keeps resident in VRAM
+    "queue_starvation_seconds": "30",
+    "memory_enabled": "true",       # per-channel / per-thread conversations
+    "memory_max_tokens": "4096",    # context budget before older turns are compacted
+    "memory_max_turns": "20",
+    "memory_keep_turns": "4",       # turns kept verbatim after compaction
+    "memory_summarize": "true",     # summarize evicted turns instead of dropping them
+    "memory_idle_minutes": "60",
+    "memory_max_sessions": "500",
 }
 
 
-SETTINGS_PATH = "settings.ini"
-host = ""
-default_model = ""
-
-
 def init(bot):
-    global host, default_model
     # Ensure defaults exist
-    ensure_settings("ollama", DEFAULTS)
-
-    # Load host + enabled
-    host = cfg("ollama", "ollama_host", "http://localhost:11434").rstrip("/")
-    default_model = cfg("ollama", "default_model", "llama3.1:latest")
-    # Ping server
-    ping_url = f"{host}/api/tags"
-    sublog(f"[ping] Contacting Ollama at {host} ...")
-
-    try:
-        r = requests.get(ping_url, timeout=3)
-
-        if r.status_code != 200:
-            sublog(f"[error] Ollama responded with HTTP {r.status_code}")
-            return
-
-        sublog("[success] Ollama server reachable.")
-
-        # Parse available models
-        data = r.json()
-        models = [m.get("name", "").strip() for m in data.get("models", []) if m.get("name")]
-
-        if not models:
-            sublog("[warning] No models returned.")
-
-        # -----------------------------------------------------
-        # Store available models into settings.ini
-        # -----------------------------------------------------
-        if os.path.exists(SETTINGS_PATH):
-            cfgfile = configparser.ConfigParser()
-            cfgfile.read(SETTINGS_PATH)
-
-            cfgfile["ollama"]["available_models"] = ",".join(models)
-
-            with open(SETTINGS_PATH, "w") as f:
-                cfgfile.write(f)
-
-            sublog("[saved] Updated available_models in settings.ini")
-
-    except Exception as e:
-        sublog(f"[error] Ollama not reachable: {e}")
-        return
-
+    ensure_settings("ollama", DEFAULTS, types={"available_models": list, "ollama_hosts": list})
+    # Hosts are health-checked asynchronously from ollama_base.start()
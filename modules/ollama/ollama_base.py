@@ -1,58 +1,490 @@
 # /app/modules/ollama/ollama_base.py
+import json
+import asyncio
 import aiohttp
+from contextlib import asynccontextmanager, nullcontext
 from core.logging import sublog
-from . import host, default_model
+from core.config import settings, subscribe, set_value
+from . import DEFAULTS
+from .ollama_cache import ResponseCache, make_key, is_deterministic
+from .ollama_scheduler import Scheduler
+from .ollama_hosts import HostPool
+from .ollama_memory import ConversationStore
 # ---------------------------------------------------------
-# Load Ollama settings (fresh every call)
+# Load Ollama settings (cached snapshot, refreshed on reload)
 # ---------------------------------------------------------
 def load_settings():
+    snap = settings("ollama")
+    host = str(snap.get("ollama_host", DEFAULTS["ollama_host"])).rstrip("/")
     return {
         "host": host,
-        "model": default_model,
+        "hosts": list(snap.get("ollama_hosts", ())) or [host],
+        "model": str(snap.get("default_model", DEFAULTS["default_model"])),
     }
 
+# ---------------------------------------------------------
+# Shared connection pool (opened in start(), closed in shutdown())
+# ---------------------------------------------------------
+_session = None
+
+
+def _session_settings():
+    snap = settings("ollama")
+    return {
+        "limit": int(snap.get("max_connections", 8)),
+        "connect": float(snap.get("connect_timeout", 5)),
+        "total": float(snap.get("request_timeout", 30)),
+        "keepalive": float(snap.get("keepalive_timeout", 60)),
+    }
+
+
+def get_session() -> aiohttp.ClientSession:
+    """Returns the pooled session, (re)creating it if needed."""
+    global _session
+    if _session is None or _session.closed:
+        opts = _session_settings()
+        connector = aiohttp.TCPConnector(
+            limit=0,
+            limit_per_host=opts["limit"],
+            keepalive_timeout=opts["keepalive"],
+            ttl_dns_cache=300,
+        )
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=opts["total"], connect=opts["connect"]),
+        )
+        sublog(f"[ollama] [base] Opened connection pool (per-host limit {opts['limit']})")
+    return _session
+
+
+async def close_session():
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+        sublog("[ollama] [base] Closed connection pool")
+    _session = None
+
+
+# ---------------------------------------------------------
+# Response cache (opt-in via cache_enabled)
+# ---------------------------------------------------------
+cache = None
+
+
+async def open_cache():
+    global cache
+    snap = settings("ollama")
+    if not snap.get("cache_enabled", False):
+        return
+    cache = ResponseCache(
+        max_entries=int(snap.get("cache_max_entries", 256)),
+        max_bytes=int(snap.get("cache_max_bytes", 4_000_000)),
+        ttl=float(snap.get("cache_ttl", 3600)),
+        db_path=str(snap.get("cache_db", "") or ""),
+        db_max_bytes=int(snap.get("cache_db_max_bytes", 64_000_000)),
+    )
+    await cache.open()
+    sublog("[ollama] [base] Response cache enabled")
+
+
+def _cache_key(model, prompt, options):
+    """Cache key if this request may use the cache, else None."""
+    if cache is None:
+        return None
+    if settings("ollama").get("cache_mode", "deterministic") != "all" and not is_deterministic(options):
+        return None
+    return make_key(model, prompt, options)
+
+
+def _turn_cache_key(convo, model, prompt, options):
+    """
+    Only a conversation's first turn is a function of (model, prompt,
+    options) alone; later turns depend on the history and bypass the cache.
+    """
+    if convo is not None and not convo.fresh:
+        return None
+    return _cache_key(model, prompt, options)
+
+
+def cache_stats():
+    return cache.stats() if cache is not None else None
+
+
+# ---------------------------------------------------------
+# Backend hosts + request scheduler
+# ---------------------------------------------------------
+pool = HostPool()
+scheduler = Scheduler(loaded_models=pool.loaded_models, model_hosts=pool.serving_count)
+memory = ConversationStore()
+
+
+def _configure(section=None, snap=None):
+    snap = snap or settings("ollama")
+    pool.set_hosts(load_settings()["hosts"])
+    scheduler.configure(
+        max_per_model=snap.get("max_inflight_per_model", 1),
+        max_per_host=snap.get("max_inflight_per_host", 2),
+        max_loaded=snap.get("max_loaded_models", 1),
+        starvation_seconds=snap.get("queue_starvation_seconds", 30),
+        hosts=max(1, pool.healthy_count()),
+    )
+    memory.configure(
+        max_tokens=snap.get("memory_max_tokens", 4096),
+        max_turns=snap.get("memory_max_turns", 20),
+        keep_turns=snap.get("memory_keep_turns", 4),
+        idle_seconds=float(snap.get("memory_idle_minutes", 60)) * 60,
+        max_sessions=snap.get("memory_max_sessions", 500),
+    )
+
+
+def _after_health_check():
+    scheduler.configure(hosts=max(1, pool.healthy_count()))
+
+    # Keep /ollama model choices in step with what the pool serves
+    models = pool.all_models()
+    if models and tuple(models) != tuple(settings("ollama").get("available_models", ())):
+        set_value("ollama", "available_models", ",".join(models))
+        sublog("[saved] Updated available_models in settings.ini")
+
+
+def init(bot):
+    _configure()
+    subscribe("ollama", _configure)
+
+
+async def start(bot):
+    session = get_session()
+    await open_cache()
+
+    hosts = ", ".join(pool.hosts)
+    sublog(f"[ping] Contacting Ollama at {hosts} ...")
+    healthy = await pool.check_all(session)
+    if healthy:
+        sublog(f"[success] {healthy}/{len(pool.hosts)} Ollama host(s) reachable.")
+    else:
+        sublog("[error] No Ollama host reachable.")
+    _after_health_check()
+
+    interval = float(settings("ollama").get("health_interval", 30))
+    pool.start_health_checks(get_session, interval, _after_health_check)
+
+
+async def shutdown(bot):
+    pool.stop_health_checks()
+    await close_session()
+    if cache is not None:
+        await cache.close()
+
+
+@asynccontextmanager
+async def _open_request(model: str, path: str, payload: dict, timeout=None):
+    """
+    POSTs to the best host for `model` and yields the 200 response.
+    Connection errors, timeouts and 5xx fail over to the next host;
+    once a response is yielded the request is committed to that host.
+    """
+    session = get_session()
+    tried = set()
+    last_error = None
+
+    while True:
+        host = pool.pick(model, tried, scheduler.max_per_host)
+        if host is None:
+            raise RuntimeError(last_error or "no Ollama hosts configured")
+        tried.add(host.url)
+
+        pool.begin(host)
+        try:
+            try:
+                response = await session.post(f"{host.url}{path}", json=payload, timeout=timeout)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                pool.failed(host, e)
+                last_error = f"{host.url}: {e or type(e).__name__}"
+                continue
+
+            async with response:
+                if response.status >= 500:
+                    pool.failed(host, f"HTTP {response.status}")
+                    last_error = f"{host.url}: HTTP {response.status}"
+                    continue
+                if response.status != 200:
+                    sublog(f"[ollama] [base] ERROR HTTP {response.status}", print_console=False)
+                    raise RuntimeError(f"Ollama returned HTTP {response.status}")
+
+                yield response
+                pool.succeeded(host, model)
+                return
+        finally:
+            pool.end(host)
+
+
+# ---------------------------------------------------------
+# Conversation memory (per channel / thread)
+# ---------------------------------------------------------
+SUMMARY_PROMPT = (
+    "Summarize the following conversation in a few sentences. Keep names, "
+    "facts, decisions and open questions; drop pleasantries.\n\n"
+)
+_background = set()
+
+
+def _conversation(session_key, model):
+    if session_key is None or not settings("ollama").get("memory_enabled", True):
+        return None
+    return memory.get(session_key, model)
+
+
+def _apply_memory(convo, prompt, payload):
+    rendered, context = memory.render(convo, prompt)
+    payload["prompt"] = rendered
+    if context:
+        payload["context"] = context
+
+
+def _finish_turn(convo, prompt, reply, context, model):
+    if not reply or not memory.record(convo, prompt, reply, context):
+        return
+
+    async def _summarize(text):
+        out = await ask_ollama(SUMMARY_PROMPT + text, model)
+        if out.startswith("❌"):
+            raise RuntimeError(out)
+        return out
+
+    summarize = _summarize if settings("ollama").get("memory_summarize", True) else None
+
+    async def _compact():
+        async with convo.lock:
+            await memory.compact(convo, summarize)
+
+    task = asyncio.ensure_future(_compact())
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+def reset_conversation(session_key) -> bool:
+    return memory.reset(session_key)
+
+
 # ---------------------------------------------------------
 # ask_ollama(prompt, model=None)
 # ---------------------------------------------------------
-async def ask_ollama(prompt: str, model: str = None) -> str:
+async def ask_ollama(prompt: str, model: str = None, options: dict = None,
+                     user_id=None, guild_id=None, on_queue=None, session_key=None) -> str:
     """
     Sends a prompt to the Ollama server.
     model=None → use default from settings.ini
+    options → Ollama generation options (seed, temperature, ...)
+    user_id/guild_id → fairness keys for the scheduler
+    on_queue(pos) → awaited when the queue position changes
+    session_key → conversation to continue (e.g. channel id)
     """
     OLLAMA = load_settings()
 
     # Resolve model
     chosen_model = model if model else OLLAMA["model"]
-    url = f"{OLLAMA['host']}/api/generate"
+    convo = _conversation(session_key, chosen_model)
 
-    sublog(f"[ollama] [base] Request → model='{chosen_model}'")
+    key = _turn_cache_key(convo, chosen_model, prompt, options)
+    if key:
+        cached = await cache.get(key)
+        if cached is not None:
+            sublog(f"[ollama] [base] Cache hit → model='{chosen_model}'", print_console=False, guild_id=guild_id)
+            if convo:
+                memory.record(convo, prompt, cached, None)
+            return cached
+
+    sublog(f"[ollama] [base] Request → model='{chosen_model}'", guild_id=guild_id)
+
+    payload = {
+        "model": chosen_model,
+        "prompt": prompt,
+        "stream": False
+    }
+    if options:
+        payload["options"] = options
 
     try:
-        async with aiohttp.ClientSession() as session:
-            response = await session.post(
-                url,
-                json={
-                    "model": chosen_model,
-                    "prompt": prompt,
-                    "stream": False
-                },
-                timeout=30
-            )
-
-            if response.status != 200:
-                sublog(f"[ollama] [base] ERROR HTTP {response.status}", print_console=False)
-                return f"❌ Ollama returned HTTP {response.status}"
-
-            data = await response.json()
-            reply = data.get("response", "").strip()
-
-            if not reply:
-                sublog("[ollama] [base] WARN empty response", print_console=False)
-                return "(empty response)"
-
-            sublog("[ollama] [base] SUCCESS response received", print_console=False)
-            return reply
+        async with (convo.lock if convo else nullcontext()):
+            if convo:
+                if not convo.fresh:
+                    key = None      # another turn landed while we waited
+                _apply_memory(convo, prompt, payload)
+
+            async with scheduler.slot(chosen_model, user_id, guild_id, on_queue), \
+                    _open_request(chosen_model, "/api/generate", payload) as response:
+
+                data = await response.json()
+                reply = data.get("response", "").strip()
+
+                if not reply:
+                    sublog("[ollama] [base] WARN empty response", print_console=False, guild_id=guild_id)
+                    return "(empty response)"
+
+                sublog("[ollama] [base] SUCCESS response received", print_console=False, guild_id=guild_id)
+                if key:
+                    await cache.put(key, chosen_model, reply)
+                if convo:
+                    _finish_turn(convo, prompt, reply, data.get("context"), chosen_model)
+                return reply
 
     except Exception as e:
-        sublog(f"[ollama] [base] EXCEPTION {e}", print_console=False)
+        sublog(f"[ollama] [base] EXCEPTION {e}", print_console=False, guild_id=guild_id)
         return f"❌ Ollama request failed: {e}"
+
+
+# ---------------------------------------------------------
+# stream_ollama(prompt, model=None)
+# Yields response text as Ollama's NDJSON stream arrives.
+# ---------------------------------------------------------
+async def stream_ollama(prompt: str, model: str = None, options: dict = None,
+                        user_id=None, guild_id=None, on_queue=None, session_key=None):
+    OLLAMA = load_settings()
+    opts = _session_settings()
+
+    chosen_model = model if model else OLLAMA["model"]
+    convo = _conversation(session_key, chosen_model)
+
+    key = _turn_cache_key(convo, chosen_model, prompt, options)
+    if key:
+        cached = await cache.get(key)
+        if cached is not None:
+            sublog(f"[ollama] [base] Cache hit → model='{chosen_model}'", print_console=False, guild_id=guild_id)
+            if convo:
+                memory.record(convo, prompt, cached, None)
+            yield cached
+            return
+
+    sublog(f"[ollama] [base] Stream → model='{chosen_model}'", guild_id=guild_id)
+
+    payload = {
+        "model": chosen_model,
+        "prompt": prompt,
+        "stream": True
+    }
+    if options:
+        payload["options"] = options
+    parts = []
+
+    # No total cap for streams; only a per-read inactivity timeout
+    timeout = aiohttp.ClientTimeout(total=None, connect=opts["connect"], sock_read=opts["total"])
+
+    context = None
+
+    async with (convo.lock if convo else nullcontext()):
+        if convo:
+            if not convo.fresh:
+                key = None          # another turn landed while we waited
+            _apply_memory(convo, prompt, payload)
+
+        async with scheduler.slot(chosen_model, user_id, guild_id, on_queue), \
+                _open_request(chosen_model, "/api/generate", payload, timeout) as response:
+
+            async for line in response.content:
+                line = line.strip()
+                if not line:
+                    continue
+
+                data = json.loads(line)
+                if data.get("error"):
+                    raise RuntimeError(data["error"])
+
+                chunk = data.get("response", "")
+                if chunk:
+                    parts.append(chunk)
+                    yield chunk
+
+                if data.get("done"):
+                    context = data.get("context")
+                    break
+
+        sublog("[ollama] [base] SUCCESS stream finished", print_console=False, guild_id=guild_id)
+
+        reply = "".join(parts).strip()
+        if key and reply:
+            await cache.put(key, chosen_model, reply)
+        if convo:
+            _finish_turn(convo, prompt, reply, context, chosen_model)
+
+
+# ---------------------------------------------------------
+# Discord output helpers
+# ---------------------------------------------------------
+DISCORD_LIMIT = 2000
+
+
+def _split_point(text: str, limit: int = DISCORD_LIMIT) -> int:
+    """Prefer breaking on a newline, then a space, in the back half."""
+    for sep in ("\n", " "):
+        cut = text.rfind(sep, limit // 2, limit)
+        if cut != -1:
+            return cut + 1
+    return limit
+
+
+def split_message(text: str, limit: int = DISCORD_LIMIT) -> list:
+    pages = []
+    while len(text) > limit:
+        cut = _split_point(text, limit)
+        pages.append(text[:cut])
+        text = text[cut:]
+    if text:
+        pages.append(text)
+    return pages
+
+
+async def send_paginated(interaction, text: str):
+    for page in split_message(text) or ["(empty response)"]:
+        await interaction.followup.send(page)
+
+
+async def relay_stream(interaction, chunks, edit_interval: float = 1.0):
+    """
+    Streams chunks into followup messages: the first token is sent
+    immediately, later tokens are coalesced into at most one edit per
+    edit_interval, and text past 2000 chars continues in a new message.
+    """
+    loop = asyncio.get_running_loop()
+    msg = None
+    sent_pages = 0
+    buf = ""
+    shown = ""
+    last_edit = 0.0
+
+    async def flush():
+        nonlocal msg, shown, last_edit
+        if msg is None:
+            msg = await interaction.followup.send(buf, wait=True)
+        elif buf != shown:
+            await msg.edit(content=buf)
+        shown = buf
+        last_edit = loop.time()
+
+    try:
+        async for chunk in chunks:
+            buf += chunk
+
+            # Page full → finalize it and continue in a fresh message
+            while len(buf) > DISCORD_LIMIT:
+                cut = _split_point(buf)
+                head, buf = buf[:cut], buf[cut:]
+                if msg is None:
+                    await interaction.followup.send(head)
+                else:
+                    await msg.edit(content=head)
+                msg = None
+                shown = ""
+                sent_pages += 1
+
+            if buf.strip() and (msg is None or loop.time() - last_edit >= edit_interval):
+                await flush()
+
+    except Exception as e:
+        sublog(f"[ollama] [base] EXCEPTION {e}", print_console=False, guild_id=interaction.guild_id)
+        buf = (buf + f"\n❌ Ollama request failed: {e}")[-DISCORD_LIMIT:]
+
+    if not buf.strip() and msg is None:
+        if sent_pages:
+            return
+        buf = "(empty response)"
+    await flush()
@@ -0,0 +1,181 @@
+# /app/modules/ollama/ollama_cache.py
+import os
+import json
+import time
+import hashlib
+from collections import OrderedDict
+
+from core.logging import sublog
+
+
+# The SQLite tier is pruned at most this often (seconds) from put()
+DB_PRUNE_INTERVAL = 60.0
+
+
+# ---------------------------------------------------------
+# Key helpers
+# ---------------------------------------------------------
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so trivially different prompts share an entry."""
+    return " ".join(prompt.split())
+
+
+def make_key(model: str, prompt: str, options: dict = None) -> str:
+    raw = json.dumps(
+        [model, normalize_prompt(prompt), options or {}],
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def is_deterministic(options: dict = None) -> bool:
+    """A fixed seed or temperature 0 makes a generation repeatable."""
+    if not options:
+        return False
+    return options.get("seed") is not None or options.get("temperature") == 0
+
+
+# ---------------------------------------------------------
+# ResponseCache — in-memory LRU + TTL, optional SQLite tier
+# ---------------------------------------------------------
+class ResponseCache:
+
+    def __init__(self, max_entries=256, max_bytes=4_000_000, ttl=3600, db_path="",
+                 db_max_bytes=64_000_000):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.db_path = db_path
+        self.db_max_bytes = db_max_bytes
+
+        self._entries = OrderedDict()   # key -> (created, reply)
+        self._bytes = 0
+        self._db = None
+        self._pruned_at = 0.0
+
+        self.hits = 0
+        self.misses = 0
+
+    # -------------------------------
+    # Lifecycle
+    # -------------------------------
+    async def open(self):
+        if not self.db_path:
+            return
+        try:
+            import aiosqlite
+        except ImportError:
+            sublog("[ollama] [cache] aiosqlite missing; persistence disabled")
+            return
+
+        folder = os.path.dirname(self.db_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self._db = await aiosqlite.connect(self.db_path)
+        await self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, model TEXT, reply TEXT, created REAL)"
+        )
+        await self._db.execute(
+            "CREATE INDEX IF NOT EXISTS responses_created ON responses (created)"
+        )
+        await self._prune_db(time.time())
+        await self._db.commit()
+        sublog(f"[ollama] [cache] Persisting to {self.db_path}")
+
+    async def _prune_db(self, now):
+        """Drops expired rows, then the oldest rows past db_max_bytes."""
+        self._pruned_at = now
+        await self._db.execute(
+            "DELETE FROM responses WHERE created < ?", (now - self.ttl,)
+        )
+        if self.db_max_bytes:
+            await self._db.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM ("
+                "  SELECT key, SUM(LENGTH(reply)) OVER (ORDER BY created DESC, rowid DESC) AS total"
+                "  FROM responses"
+                " ) WHERE total > ?)",
+                (self.db_max_bytes,),
+            )
+
+    async def close(self):
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+    # -------------------------------
+    # Memory tier
+    # -------------------------------
+    def _remember(self, key, created, reply):
+        old = self._entries.pop(key, None)
+        if old:
+            self._bytes -= len(old[1])
+
+        self._entries[key] = (created, reply)
+        self._bytes += len(reply)
+
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+
+    def _forget(self, key):
+        old = self._entries.pop(key, None)
+        if old:
+            self._bytes -= len(old[1])
+
+    # -------------------------------
+    # Public API
+    # -------------------------------
+    async def get(self, key: str):
+        now = time.time()
+
+        entry = self._entries.get(key)
+        if entry:
+            if now - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self._forget(key)
+
+        if self._db is not None:
+            async with self._db.execute(
+                "SELECT reply, created FROM responses WHERE key = ?", (key,)
+            ) as cur:
+                row = await cur.fetchone()
+            if row and now - row[1] < self.ttl:
+                self._remember(key, row[1], row[0])
+                self.hits += 1
+                return row[0]
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, model: str, reply: str):
+        now = time.time()
+        self._remember(key, now, reply)
+
+        if self._db is not None:
+            await self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, model, reply, created)"
+                " VALUES (?, ?, ?, ?)",
+                (key, model, reply, now),
+            )
+            if now - self._pruned_at >= DB_PRUNE_INTERVAL:
+                await self._prune_db(now)
+            await self._db.commit()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "persistent": self._db is not None,
+        }
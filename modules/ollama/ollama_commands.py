@@ -3,8 +3,30 @@
 import discord
 from discord import app_commands
 
-from core.config import cfg
-from .ollama_base import ask_ollama
+from core.config import settings
+from .ollama_base import (
+    ask_ollama,
+    stream_ollama,
+    relay_stream,
+    send_paginated,
+    cache_stats,
+    reset_conversation,
+)
+
+
+# -------------------------------------------------------
+# Queue position feedback on the deferred "thinking" message
+# -------------------------------------------------------
+def queue_reporter(interaction: discord.Interaction):
+    async def report(pos: int):
+        try:
+            if pos:
+                await interaction.edit_original_response(content=f"⏳ Waiting in queue — position {pos}")
+            else:
+                await interaction.edit_original_response(content="💭 Generating…")
+        except discord.HTTPException:
+            pass
+    return report
 
 
 def register(bot):
@@ -20,26 +42,29 @@ def register(bot):
         await interaction.response.defer(thinking=True)
 
         reply = await ask_ollama("test connection")
-        reply = reply[:2000] if reply else "❌ No response from Ollama."
+        reply = reply if reply else "❌ No response from Ollama."
 
-        await interaction.followup.send(reply)
+        await send_paginated(interaction, reply)
 
     # -------------------------------------------------------
     # Get available models from settings.ini
     # -------------------------------------------------------
     def get_available_models():
-        raw = cfg("ollama", "available_models", "")
-        return [m.strip() for m in raw.split(",") if m.strip()]
+        return list(settings("ollama").get("available_models", ()))
 
     # -------------------------------------------------------
-    # Dynamic choices
+    # Dynamic choices — read on every keystroke, so models found
+    # by the health checks show up without re-registering
     # -------------------------------------------------------
-    def model_choices():
+    async def model_autocomplete(interaction: discord.Interaction, current: str):
         lst = get_available_models()
-        return (
-            [app_commands.Choice(name=m, value=m) for m in lst]
-            if lst else [app_commands.Choice(name="default", value="")]
-        )
+        if not lst:
+            return [app_commands.Choice(name="default", value="")]
+        return [
+            app_commands.Choice(name=m, value=m)
+            for m in lst
+            if current.lower() in m.lower()
+        ][:25]
 
     # -------------------------------------------------------
     # /ollama prompt + optional model
@@ -50,19 +75,86 @@ def register(bot):
     )
     @app_commands.describe(
         prompt="Your message to the LLM",
-        model="Choose a model (optional)"
+        model="Choose a model (optional)",
+        seed="Fixed seed for repeatable output (optional)",
+        temperature="Sampling temperature, 0 = deterministic (optional)"
     )
-    @app_commands.choices(model=model_choices())
+    @app_commands.autocomplete(model=model_autocomplete)
     async def ollama_cmd(
         interaction: discord.Interaction,
         prompt: str,
-        model: app_commands.Choice[str] = None
+        model: str = None,
+        seed: int = None,
+        temperature: float = None
     ):
         await interaction.response.defer(thinking=True)
-        # Pass model.value if it exists, otherwise None
-        chosen = model.value if model else None
+        # Empty / omitted → default model from settings
+        chosen = model or None
+
+        options = {}
+        if seed is not None:
+            options["seed"] = seed
+        if temperature is not None:
+            options["temperature"] = temperature
+        options = options or None
+
+        snap = settings("ollama")
+        if snap.get("stream", True):
+            return await relay_stream(
+                interaction,
+                stream_ollama(
+                    prompt, chosen, options,
+                    user_id=interaction.user.id,
+                    guild_id=interaction.guild_id,
+                    on_queue=queue_reporter(interaction),
+                    session_key=interaction.channel_id,
+                ),
+                float(snap.get("stream_edit_interval", 1.0)),
+            )
 
-        reply = await ask_ollama(prompt, chosen)
-        reply = reply[:2000] if reply else "❌ No response from Ollama."
+        reply = await ask_ollama(
+            prompt, chosen, options,
+            user_id=interaction.user.id,
+            guild_id=interaction.guild_id,
+            on_queue=queue_reporter(interaction),
+            session_key=interaction.channel_id,
+        )
+        reply = reply if reply else "❌ No response from Ollama."
+
+        await send_paginated(interaction, reply)
 
-        await interaction.followup.send(reply)
+    # -------------------------------------------------------
+    # /ollama_reset — forget this channel's conversation
+    # -------------------------------------------------------
+    @bot.tree.command(
+        name="ollama_reset",
+        description="Forget the Ollama conversation in this channel."
+    )
+    async def ollama_reset_cmd(interaction: discord.Interaction):
+        cleared = reset_conversation(interaction.channel_id)
+        await interaction.response.send_message(
+            "🧹 Conversation cleared." if cleared else "No conversation to clear.",
+            ephemeral=True
+        )
+
+    # -------------------------------------------------------
+    # /ollama_cache — response cache hit/miss counters
+    # -------------------------------------------------------
+    @bot.tree.command(
+        name="ollama_cache",
+        description="Show Ollama response cache statistics."
+    )
+    async def ollama_cache_cmd(interaction: discord.Interaction):
+        stats = cache_stats()
+        if stats is None:
+            return await interaction.response.send_message(
+                "Response cache is disabled.", ephemeral=True
+            )
+
+        await interaction.response.send_message(
+            f"🗃️ **Ollama cache** — hits {stats['hits']}, misses {stats['misses']} "
+            f"({stats['hit_rate']:.0%}), {stats['entries']} entries, "
+            f"{stats['bytes'] / 1024:.0f} KiB"
+            f"{', persistent' if stats['persistent'] else ''}",
+            ephemeral=True
+        )
@@ -0,0 +1,168 @@
+# /app/modules/ollama/ollama_hosts.py
+import time
+import asyncio
+import aiohttp
+
+from core.logging import sublog
+
+
+# ---------------------------------------------------------
+# One Ollama backend
+# ---------------------------------------------------------
+class OllamaHost:
+    __slots__ = ("url", "healthy", "models", "loaded", "outstanding",
+                 "failures", "last_check", "latency")
+
+    def __init__(self, url):
+        self.url = url
+        self.healthy = True         # optimistic until the first check says otherwise
+        self.models = set()         # available on disk (/api/tags)
+        self.loaded = set()         # resident in memory (/api/ps)
+        self.outstanding = 0
+        self.failures = 0
+        self.last_check = 0.0
+        self.latency = None
+
+    def __repr__(self):
+        return f"<OllamaHost {self.url} healthy={self.healthy} outstanding={self.outstanding}>"
+
+
+# ---------------------------------------------------------
+# HostPool — health checks + least-outstanding routing
+# with model affinity and failover
+# ---------------------------------------------------------
+class HostPool:
+
+    def __init__(self, urls=()):
+        self.hosts = {}
+        self.set_hosts(urls)
+        self._task = None
+
+    def set_hosts(self, urls):
+        """Replace the host list, keeping state for hosts that remain."""
+        urls = [u.rstrip("/") for u in urls if u and u.strip()]
+        self.hosts = {u: self.hosts.get(u) or OllamaHost(u) for u in urls}
+
+    # -------------------------------
+    # Health
+    # -------------------------------
+    async def check(self, session, host, timeout=3):
+        started = time.monotonic()
+        t = aiohttp.ClientTimeout(total=timeout)
+        try:
+            async with session.get(f"{host.url}/api/tags", timeout=t) as r:
+                r.raise_for_status()
+                data = await r.json()
+            host.models = {m["name"] for m in data.get("models", []) if m.get("name")}
+
+            # /api/ps is newer; older servers just won't report residency
+            try:
+                async with session.get(f"{host.url}/api/ps", timeout=t) as r:
+                    if r.status == 200:
+                        data = await r.json()
+                        host.loaded = {m.get("name") or m.get("model") for m in data.get("models", [])}
+            except Exception:
+                pass
+
+            if not host.healthy:
+                sublog(f"[ollama] [hosts] {host.url} is back up")
+            host.healthy = True
+            host.failures = 0
+            host.latency = time.monotonic() - started
+
+        except Exception as e:
+            if host.healthy:
+                sublog(f"[ollama] [hosts] {host.url} unhealthy: {e}")
+            host.healthy = False
+            host.loaded = set()
+
+        host.last_check = time.monotonic()
+        return host.healthy
+
+    async def check_all(self, session):
+        if self.hosts:
+            await asyncio.gather(*(self.check(session, h) for h in list(self.hosts.values())))
+        return self.healthy_count()
+
+    def start_health_checks(self, get_session, interval=30.0, on_checked=None):
+        async def _loop():
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await self.check_all(get_session())
+                    if on_checked:
+                        on_checked()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    sublog(f"[ollama] [hosts] health loop error: {e}")
+
+        self.stop_health_checks()
+        self._task = asyncio.ensure_future(_loop())
+
+    def stop_health_checks(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    # -------------------------------
+    # Routing
+    # -------------------------------
+    def pick(self, model, exclude=(), max_outstanding=None):
+        """
+        Least outstanding requests, preferring hosts with `model`
+        already loaded, then hosts that have it on disk. Hosts at
+        max_outstanding are skipped while another healthy host has
+        room, and unhealthy hosts are only used when nothing healthy
+        is left.
+        """
+        candidates = [h for u, h in self.hosts.items() if u not in exclude]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda h: (
+            not h.healthy,
+            bool(max_outstanding) and h.outstanding >= max_outstanding,
+            model not in h.loaded,
+            bool(h.models) and model not in h.models,
+            h.outstanding,
+            h.failures,
+        ))
+
+    def begin(self, host):
+        host.outstanding += 1
+
+    def end(self, host):
+        host.outstanding -= 1
+
+    def succeeded(self, host, model):
+        host.failures = 0
+        host.healthy = True
+        host.loaded.add(model)
+
+    def failed(self, host, error):
+        host.failures += 1
+        host.healthy = False
+        sublog(f"[ollama] [hosts] {host.url} failed ({error}); failing over", print_console=False)
+
+    # -------------------------------
+    # Aggregates
+    # -------------------------------
+    def healthy_count(self):
+        return sum(1 for h in self.hosts.values() if h.healthy)
+
+    def all_models(self):
+        models = set()
+        for h in self.hosts.values():
+            models |= h.models
+        return sorted(models)
+
+    def serving_count(self, model):
+        """Healthy hosts that have `model` (or have not reported their models yet)."""
+        return sum(1 for h in self.hosts.values() if h.healthy and (not h.models or model in h.models))
+
+    def loaded_models(self):
+        models = set()
+        for h in self.hosts.values():
+            if h.healthy:
+                models |= h.loaded
+        return models
@@ -0,0 +1,156 @@
+# /app/modules/ollama/ollama_memory.py
+import time
+import asyncio
+from array import array
+from collections import OrderedDict, deque
+
+from core.logging import sublog
+
+
+# ---------------------------------------------------------
+# Conversation records
+# ---------------------------------------------------------
+class Turn:
+    __slots__ = ("prompt", "reply")
+
+    def __init__(self, prompt, reply):
+        self.prompt = prompt
+        self.reply = reply
+
+
+class Conversation:
+    """
+    One channel/thread's history. `context` is the token vector Ollama
+    returned for the last turn, stored as a compact int array and sent
+    back so the server can reuse its KV cache instead of re-reading
+    the whole transcript.
+    """
+
+    __slots__ = ("key", "model", "context", "turns", "summary", "last_used", "lock")
+
+    def __init__(self, key, model, max_turns):
+        self.key = key
+        self.model = model
+        self.context = None
+        self.turns = deque(maxlen=max_turns)
+        self.summary = ""
+        self.last_used = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    @property
+    def tokens(self):
+        return len(self.context) if self.context is not None else 0
+
+    @property
+    def fresh(self):
+        """No history yet: the next turn depends only on its prompt."""
+        return self.context is None and not self.turns and not self.summary
+
+
+# ---------------------------------------------------------
+# ConversationStore — bounded per-key sessions
+# ---------------------------------------------------------
+class ConversationStore:
+
+    def __init__(self, max_tokens=4096, max_turns=20, keep_turns=4,
+                 idle_seconds=3600, max_sessions=500):
+        self.max_tokens = max_tokens
+        self.max_turns = max_turns
+        self.keep_turns = keep_turns
+        self.idle_seconds = idle_seconds
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+
+    def configure(self, **opts):
+        for name, value in opts.items():
+            if value is not None:
+                setattr(self, name, int(value))
+
+    def _prune(self):
+        now = time.monotonic()
+        for key in [k for k, c in self._sessions.items()
+                    if now - c.last_used > self.idle_seconds and not c.lock.locked()]:
+            del self._sessions[key]
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    def get(self, key, model) -> Conversation:
+        convo = self._sessions.get(key)
+
+        # Context vectors are model-specific; switching models starts over
+        if convo is not None and convo.model != model and not convo.lock.locked():
+            sublog(f"[ollama] [memory] {key}: model changed, resetting", print_console=False)
+            convo = None
+
+        if convo is None:
+            self._prune()
+            convo = Conversation(key, model, self.max_turns)
+            self._sessions[key] = convo
+
+        convo.last_used = time.monotonic()
+        self._sessions.move_to_end(key)
+        return convo
+
+    def reset(self, key) -> bool:
+        return self._sessions.pop(key, None) is not None
+
+    # -------------------------------
+    # Request / response
+    # -------------------------------
+    @staticmethod
+    def render(convo: Conversation, prompt: str):
+        """
+        Returns (prompt, context). With a live context only the new
+        prompt is sent; otherwise the summary + kept turns are replayed.
+        """
+        if convo.context is not None:
+            return prompt, convo.context.tolist()
+
+        if not convo.summary and not convo.turns:
+            return prompt, None
+
+        parts = []
+        if convo.summary:
+            parts.append(f"Summary of the conversation so far:\n{convo.summary}\n")
+        for turn in convo.turns:
+            parts.append(f"User: {turn.prompt}\nAssistant: {turn.reply}\n")
+        parts.append(f"User: {prompt}\nAssistant:")
+        return "\n".join(parts), None
+
+    def record(self, convo: Conversation, prompt: str, reply: str, context) -> bool:
+        """Stores a finished turn. Returns True when the budget is exceeded."""
+        convo.turns.append(Turn(prompt, reply))
+        convo.context = array("i", context) if context else None
+        convo.last_used = time.monotonic()
+        return convo.tokens > self.max_tokens
+
+    async def compact(self, convo: Conversation, summarize=None):
+        """
+        Evicts all but the newest keep_turns turns. With `summarize`
+        (async text → text) the evicted turns are folded into a running
+        summary instead of being dropped. The context vector is released
+        so the next turn starts from the shorter replay.
+        """
+        keep = max(0, self.keep_turns)
+        evicted = list(convo.turns)[:max(0, len(convo.turns) - keep)]
+        kept = list(convo.turns)[len(evicted):]
+
+        if evicted and summarize:
+            transcript = "\n".join(f"User: {t.prompt}\nAssistant: {t.reply}" for t in evicted)
+            if convo.summary:
+                transcript = f"Earlier summary:\n{convo.summary}\n\n{transcript}"
+            try:
+                convo.summary = (await summarize(transcript)).strip()[:4000]
+            except Exception as e:
+                sublog(f"[ollama] [memory] summarize failed: {e}", print_console=False)
+
+        convo.turns.clear()
+        convo.turns.extend(kept)
+        convo.context = None
+        sublog(f"[ollama] [memory] {convo.key}: compacted, evicted {len(evicted)} turn(s)", print_console=False)
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._sessions),
+            "tokens": sum(c.tokens for c in self._sessions.values()),
+        }
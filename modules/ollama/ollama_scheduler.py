@@ -0,0 +1,199 @@
+# /app/modules/ollama/ollama_scheduler.py
+import time
+import asyncio
+import itertools
+from collections import Counter, OrderedDict
+from contextlib import asynccontextmanager
+
+from core.logging import sublog
+
+
+# ---------------------------------------------------------
+# Ticket — one queued request
+# ---------------------------------------------------------
+class _Ticket:
+    __slots__ = ("model", "user_id", "guild_id", "seq", "enqueued",
+                 "future", "on_position", "position")
+
+    def __init__(self, model, user_id, guild_id, seq, on_position):
+        self.model = model
+        self.user_id = user_id
+        self.guild_id = guild_id
+        self.seq = seq
+        self.enqueued = time.monotonic()
+        self.future = asyncio.get_running_loop().create_future()
+        self.on_position = on_position
+        self.position = 0
+
+
+# ---------------------------------------------------------
+# Scheduler
+#   - caps in-flight requests per model per host (the model cap
+#     scales with the hosts able to serve it) and overall per host
+#   - serves models that are already resident before ones that
+#     would force a VRAM swap
+#   - orders waiters fairly by in-flight count per user / guild
+#   - waiters older than starvation_seconds jump the queue
+# ---------------------------------------------------------
+class Scheduler:
+
+    def __init__(self, max_per_model=1, max_per_host=2, max_loaded=1, starvation_seconds=30.0,
+                 hosts=1, loaded_models=None, model_hosts=None):
+        self.max_per_model = max_per_model
+        self.max_per_host = max_per_host
+        self.max_loaded = max_loaded
+        self.starvation_seconds = starvation_seconds
+        self.hosts = hosts
+        # Optional callable → set of models the backends report as loaded
+        self.loaded_models = loaded_models
+        # Optional callable(model) → healthy hosts able to serve it;
+        # without it every host is assumed to serve every model
+        self.model_hosts = model_hosts
+
+        self._waiting = []
+        self._seq = itertools.count()
+        self._inflight = 0
+        self._inflight_model = Counter()
+        self._inflight_user = Counter()
+        self._inflight_guild = Counter()
+        self._resident = OrderedDict()      # most recently served models
+        self._callbacks = set()
+        self._loop = None
+
+    def configure(self, max_per_model=None, max_per_host=None, max_loaded=None, starvation_seconds=None,
+                  hosts=None):
+        if max_per_model is not None:
+            self.max_per_model = max(1, int(max_per_model))
+        if max_per_host is not None:
+            self.max_per_host = max(1, int(max_per_host))
+        if max_loaded is not None:
+            self.max_loaded = max(1, int(max_loaded))
+        if starvation_seconds is not None:
+            self.starvation_seconds = float(starvation_seconds)
+        if hosts is not None:
+            self.hosts = max(1, int(hosts))
+
+        # Raised limits may free slots for waiters. configure() can run on
+        # the settings watcher thread, so dispatch on the event loop.
+        if self._loop is not None and self._waiting:
+            self._loop.call_soon_threadsafe(self._dispatch)
+
+    @property
+    def capacity(self):
+        return self.max_per_host * self.hosts
+
+    # -------------------------------
+    # Ordering
+    # -------------------------------
+    def _priority(self, ticket, now, loaded=()):
+        starving = now - ticket.enqueued >= self.starvation_seconds
+        return (
+            not starving,
+            ticket.model not in self._resident and ticket.model not in loaded,
+            self._inflight_user[ticket.user_id],
+            self._inflight_guild[ticket.guild_id],
+            ticket.seq,
+        )
+
+    def _hosts_for(self, model):
+        if self.model_hosts is None:
+            return self.hosts
+        return max(1, self.model_hosts(model))
+
+    def _grantable(self, ticket):
+        return self._inflight_model[ticket.model] < self.max_per_model * self._hosts_for(ticket.model)
+
+    # -------------------------------
+    # Dispatch
+    # -------------------------------
+    def _grant(self, ticket):
+        self._waiting.remove(ticket)
+        self._inflight += 1
+        self._inflight_model[ticket.model] += 1
+        self._inflight_user[ticket.user_id] += 1
+        self._inflight_guild[ticket.guild_id] += 1
+
+        self._resident[ticket.model] = True
+        self._resident.move_to_end(ticket.model)
+        while len(self._resident) > self.max_loaded:
+            self._resident.popitem(last=False)
+
+        ticket.future.set_result(None)
+
+    def _dispatch(self):
+        now = time.monotonic()
+        loaded = self.loaded_models() if (self.loaded_models and self._waiting) else ()
+
+        while self._waiting and self._inflight < self.capacity:
+            candidates = [t for t in self._waiting if self._grantable(t)]
+            if not candidates:
+                break
+            self._grant(min(candidates, key=lambda t: self._priority(t, now, loaded)))
+
+        self._report_positions(now, loaded)
+
+    def _report_positions(self, now, loaded=()):
+        ordered = sorted(self._waiting, key=lambda t: self._priority(t, now, loaded))
+        for pos, ticket in enumerate(ordered, start=1):
+            if ticket.position == pos:
+                continue
+            ticket.position = pos
+            if ticket.on_position:
+                self._fire(ticket.on_position, pos)
+
+    def _fire(self, callback, pos):
+        task = asyncio.ensure_future(callback(pos))
+        self._callbacks.add(task)
+        task.add_done_callback(self._callbacks.discard)
+
+    def _release(self, ticket):
+        self._inflight -= 1
+        self._inflight_model[ticket.model] -= 1
+        self._inflight_user[ticket.user_id] -= 1
+        self._inflight_guild[ticket.guild_id] -= 1
+        self._dispatch()
+
+    # -------------------------------
+    # Public API
+    # -------------------------------
+    @asynccontextmanager
+    async def slot(self, model, user_id=None, guild_id=None, on_position=None):
+        """
+        Waits for a free slot for `model`.
+        on_position(pos) is awaited (as a task) when the queue position
+        changes; pos == 0 means the request has started after waiting.
+        """
+        self._loop = asyncio.get_running_loop()
+        ticket = _Ticket(model, user_id, guild_id, next(self._seq), on_position)
+        self._waiting.append(ticket)
+        self._dispatch()
+
+        waited = not ticket.future.done()
+        if waited:
+            sublog(f"[ollama] [sched] Queued model='{model}' position {ticket.position}", print_console=False)
+
+        try:
+            await ticket.future
+        except BaseException:
+            if ticket in self._waiting:
+                self._waiting.remove(ticket)
+                self._dispatch()
+            elif ticket.future.done() and not ticket.future.cancelled():
+                self._release(ticket)
+            raise
+
+        if waited and on_position:
+            self._fire(on_position, 0)
+
+        try:
+            yield
+        finally:
+            self._release(ticket)
+
+    def stats(self) -> dict:
+        return {
+            "waiting": len(self._waiting),
+            "inflight": self._inflight,
+            "per_model": dict(+self._inflight_model),
+            "resident": list(self._resident),
+        }
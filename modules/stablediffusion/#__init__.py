@@ -10,7 +10,20 @@ DEFAULTS = {
     "default_width": "512",
     "default_height": "512",
     "default_steps": "4",
-    "default_seed": "0",
+    "default_seed": "0",            # 0 = random per image
+    "draft_steps": "2",             # /imagine draft:True (refiner off); at most half of default_steps
+    "default_workflow": "default",  # workflows/<name>.json
+    "max_connections": "4",     # pooled connections to ComfyUI
+    "connect_timeout": "5",
+    "request_timeout": "60",    # per HTTP call
+    "render_timeout": "240",    # whole render, submit → outputs
+    "max_inflight": "1",        # concurrent ComfyUI submissions
+    "max_per_user": "2",        # queued + running images per user
+    "batching": "false",        # merge identical queued prompts into one batch
+    "max_batch": "4",
+    "render_cache": "true",     # reuse images for fixed-seed, identical requests
+    "render_cache_dir": "data/renders",
+    "render_cache_max_mb": "512",
 }
 
 # ============================================================
@@ -1,16 +1,16 @@
 # /app/modules/stablediffusion/stablediffusion_base.py
 
-import os
 import io
-import json
 import asyncio
-import urllib.parse
-import requests
 import discord
 import random
 
 from core.logging import log
-from core.config import cfg
+from core.config import settings
+from .stablediffusion_client import client
+from .stablediffusion_workflows import workflows
+from .stablediffusion_queue import RenderQueue
+from .stablediffusion_cache import render_cache, graph_key
 
 
 # ============================================================
@@ -18,136 +18,193 @@ from core.config import cfg
 # ============================================================
 SETTINGS_SECTION = "stablediffusion"
 
-WORKFLOW_PATH = "app/modules/stablediffusion/workflows/default.json"
-
 
 # ============================================================
 # LOAD SETTINGS (NO ensure_settings)
 # ============================================================
 def load_sd_config():
+    sd = settings(SETTINGS_SECTION)
     return {
-        "host": cfg(SETTINGS_SECTION, "sd_host", "http://127.0.0.1:8188").rstrip("/"),
+        "host": str(sd.get("sd_host", "http://127.0.0.1:8188")).rstrip("/"),
     }
 
 
 # ============================================================
-# WORKFLOW PREPARATION (ONLY MODIFY NODE 56)
+# WORKFLOW PREPARATION
 # ============================================================
-def load_and_patch_workflow(prompt: str):
-    if not os.path.exists(WORKFLOW_PATH):
-        raise FileNotFoundError(f"Workflow file not found: {WORKFLOW_PATH}")
-
-    with open(WORKFLOW_PATH, "r", encoding="utf-8") as f:
-        graph = json.load(f)
-
-    save_node_id = None
-
-    for node_id, node in graph.items():
-        inputs = node.get("inputs", {})
-        ctype = node.get("class_type", "")
-
-        # ---- ONLY update node 56 ----
-        if node_id == "56" and "value" in inputs:
-            inputs["value"] = prompt
-        if node_id == "155" and "value" in inputs:
-            inputs["value"] = random.randint(1, 2_147_483_647)
-
-        # ---- Find SaveImage node ----
-        if ctype == "SaveImage":
-            save_node_id = node_id
-
-    if not save_node_id:
-        raise RuntimeError("SaveImage node not found in workflow.")
-
-    return graph, save_node_id
+def load_workflow(workflow: str = None):
+    name = workflow or str(settings(SETTINGS_SECTION).get("default_workflow", "default"))
+    return workflows.get(name)
+
+
+def _dimension(value):
+    # Latent space is 1/8 of the image; keep sizes on that grid
+    return max(64, min(2048, int(value) // 8 * 8))
+
+
+def build_values(prompt, width=None, height=None, steps=None, seed=None, draft=False):
+    """
+    Patch values for one request: command overrides, then the
+    draft preset, then the default_* settings. Seed 0 = random.
+    Draft steps are capped at half the default so a draft is always
+    cheaper, even with an old draft_steps in settings.ini.
+    """
+    sd = settings(SETTINGS_SECTION)
+
+    if not steps:
+        steps = int(sd.get("default_steps", 4))
+        if draft:
+            steps = min(int(sd.get("draft_steps", 2)), max(1, steps // 2))
+
+    values = {
+        "prompt": prompt,
+        "width": _dimension(width or sd.get("default_width", 512)),
+        "height": _dimension(height or sd.get("default_height", 512)),
+        "steps": max(1, int(steps)),
+        "seed": int(seed or sd.get("default_seed", 0) or 0),
+    }
+    if draft:
+        values["refine"] = False
+    return values
 
 
 # ============================================================
-# COMFYUI HELPERS
+# RENDERING (runs one queue submission, possibly batched)
 # ============================================================
-async def post_prompt(host: str, graph: dict) -> str:
-    url = f"{host}/prompt"
+async def fetch_image_bytes(history: dict, save_node_id: str, count: int = 1) -> list:
+    images = history["outputs"][str(save_node_id)]["images"][:count]
+    return list(await asyncio.gather(*(client.fetch_image(out) for out in images)))
 
-    def _task():
-        r = requests.post(url, json={"prompt": graph, "client_id": "discord-sd"}, timeout=600)
-        r.raise_for_status()
-        return r.json()
 
-    data = await asyncio.to_thread(_task)
-    pid = data.get("prompt_id")
-    if not pid:
-        raise RuntimeError("ComfyUI did not return prompt_id")
-    return pid
+async def _render(jobs) -> list:
+    head = jobs[0]
+    template = head.template
+    values = dict(head.values)
+    if len(jobs) > 1:
+        values["batch_size"] = len(jobs)
 
+    graph = template.render(**values)
 
-async def wait_for_history(host: str, pid: str, timeout=240):
-    url = f"{host}/history/{pid}"
-    end = asyncio.get_event_loop().time() + timeout
+    pid = await client.post_prompt(graph)
+    log(f"[stablediffusion] submitted prompt_id {pid} ({len(jobs)} image(s))")
 
-    while True:
-        if asyncio.get_event_loop().time() > end:
-            raise TimeoutError("Timed out waiting for ComfyUI history.")
+    def progress(value, maximum, node):
+        title = graph.get(str(node), {}).get("_meta", {}).get("title", "")
+        for job in jobs:
+            if job.on_progress:
+                job.on_progress(value, maximum, title)
 
-        def _task():
-            r = requests.get(url, timeout=30)
-            if r.status_code == 404:
-                return None
-            try:
-                r.raise_for_status()
-                return r.json()
-            except:
-                return None
+    timeout = float(settings(SETTINGS_SECTION).get("render_timeout", 240))
+    history = await client.wait(pid, timeout, progress)
+    log(f"[stablediffusion] outputs ready for {pid}")
 
-        history = await asyncio.to_thread(_task)
+    return await fetch_image_bytes(history, template.output, len(jobs))
 
-        if history and pid in history and "outputs" in history[pid]:
-            return history[pid]
 
-        await asyncio.sleep(0.25)
+render_queue = RenderQueue(_render)
 
 
-async def fetch_image_bytes(host: str, history: dict, save_node_id: str) -> bytes:
-    out = history["outputs"][str(save_node_id)]["images"][0]
+# ============================================================
+# LIFECYCLE (client session is owned by these hooks)
+# ============================================================
+def _configure_client():
+    sd = settings(SETTINGS_SECTION)
+    client.configure(
+        host=load_sd_config()["host"],
+        max_connections=sd.get("max_connections", 4),
+        connect_timeout=sd.get("connect_timeout", 5),
+        request_timeout=sd.get("request_timeout", 60),
+    )
+    render_queue.configure(
+        max_inflight=sd.get("max_inflight", 1),
+        max_per_user=sd.get("max_per_user", 2),
+        batching=sd.get("batching", False),
+        max_batch=sd.get("max_batch", 4),
+    )
+    render_cache.enabled = bool(sd.get("render_cache", True))
+    render_cache.folder = str(sd.get("render_cache_dir", "") or "")
+    render_cache.max_bytes = int(float(sd.get("render_cache_max_mb", 512)) * 1048576)
+
 
-    query = urllib.parse.urlencode({
-        "filename": out["filename"],
-        "subfolder": out.get("subfolder", ""),
-        "type": out.get("type", "output"),
-    })
+def init(bot):
+    _configure_client()
 
-    url = f"{host}/view?{query}"
 
-    def _task():
-        r = requests.get(url, timeout=60)
-        r.raise_for_status()
-        return r.content
+async def start(bot):
+    render_cache.open()
+    client.session()
+    client.start_events()
 
-    return await asyncio.to_thread(_task)
+
+async def shutdown(bot):
+    await client.close()
 
 
 # ============================================================
 # PUBLIC /imagine ENTRY
 # ============================================================
-async def imagine_command(interaction: discord.Interaction, prompt: str):
-    sd = load_sd_config()
-
+async def imagine_command(interaction: discord.Interaction, prompt: str, workflow: str = None,
+                          width: int = None, height: int = None, steps: int = None,
+                          seed: int = None, draft: bool = False,
+                          on_position=None, on_progress=None):
     log(f"[stablediffusion] /imagine by {interaction.user} — {prompt!r}")
 
-    graph, save_node_id = load_and_patch_workflow(prompt)
+    template = load_workflow(workflow)
+    values = build_values(prompt, width, height, steps, seed, draft)
 
-    pid = await post_prompt(sd["host"], graph)
-    log(f"[stablediffusion] submitted prompt_id {pid}")
-
-    history = await wait_for_history(sd["host"], pid)
-    log(f"[stablediffusion] history ready for {pid}")
+    # e.g. explicit steps on a workflow whose refiner is already off
+    draft_noop = draft and template.render(**values) == template.render(
+        **build_values(prompt, width, height, steps, seed)
+    )
 
-    img_bytes = await fetch_image_bytes(sd["host"], history, save_node_id)
+    fixed_seed = bool(values["seed"])
+    if not fixed_seed:
+        values["seed"] = random.randint(1, 2_147_483_647)
+
+    # Images in one EmptyLatentImage batch share the prompt conditioning,
+    # so only identical requests merge; a fixed seed is never batched
+    batch_key = None
+    if template.supports("batch_size") and not fixed_seed:
+        batch_key = (template.name,) + tuple(sorted((k, v) for k, v in values.items() if k != "seed"))
+
+    # Same graph + fixed seed → same image; served without ComfyUI
+    cache_key = graph_key(template.render(**values)) if fixed_seed else None
+    img_bytes = await render_cache.get(cache_key) if cache_key else None
+    cached = img_bytes is not None
+
+    if cached:
+        log(f"[stablediffusion] render cache hit {cache_key[:12]}")
+    else:
+        img_bytes = await render_queue.submit(
+            interaction.user.id, template, values,
+            batch_key=batch_key,
+            on_position=on_position,
+            on_progress=on_progress,
+        )
+        if cache_key:
+            await render_cache.put(cache_key, img_bytes)
 
     file = discord.File(io.BytesIO(img_bytes), filename="image.png")
 
+    details = f"{values['width']}x{values['height']}, {values['steps']} steps"
+    if fixed_seed:
+        details += f", seed {values['seed']}"
+    if draft_noop:
+        details += ", draft changed nothing for this workflow"
+    elif draft:
+        details += ", draft"
+    if cached:
+        details += ", cached"
+
     await interaction.followup.send(
-        content=f"🖼️ **Prompt:** `{prompt}`",
+        content=f"🖼️ **Prompt:** `{prompt}` ({details})",
         file=file
     )
 
     log("[stablediffusion] image delivered.")
+
+
+def cache_stats():
+    stats = render_cache.stats()
+    stats["queue"] = render_queue.stats()
+    return stats
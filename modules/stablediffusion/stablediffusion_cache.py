@@ -0,0 +1,112 @@
+# /app/modules/stablediffusion/stablediffusion_cache.py
+
+import os
+import json
+import asyncio
+import hashlib
+
+from core.disk_lru import DiskLRU
+from core.logging import sublog
+
+
+# ============================================================
+# Canonical graph hash
+# ============================================================
+def graph_key(graph: dict) -> str:
+    """sha256 of the fully patched graph with keys sorted."""
+    blob = json.dumps(graph, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+# ============================================================
+# RenderCache
+#   graph hash → <dir>/<hash>.png
+#   LRU by file mtime under a disk budget. Only renders with a
+#   fixed seed are deterministic, so callers only cache those.
+# ============================================================
+class RenderCache(DiskLRU):
+
+    suffix = ".png"
+
+    def __init__(self, folder="", enabled=False, max_bytes=512 * 1024 * 1024):
+        super().__init__(folder, enabled, max_bytes)
+
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+
+    # -------------------------------
+    # Lifecycle
+    # -------------------------------
+    def open(self):
+        if super().open():
+            sublog(f"[stablediffusion] [cache] {len(self._files)} renders, "
+                   f"{self._bytes / 1048576:.1f} MB in {self.folder}")
+
+    # -------------------------------
+    # Get / put
+    # -------------------------------
+    async def get(self, key):
+        if not self.enabled:
+            return None
+
+        if key not in self._files:
+            self.misses += 1
+            return None
+
+        path = self.path_for(key)
+
+        def _read():
+            os.utime(path)
+            with open(path, "rb") as f:
+                return f.read()
+
+        try:
+            data = await asyncio.to_thread(_read)
+        except OSError:
+            self._drop(key)
+            self.misses += 1
+            return None
+
+        self._files.move_to_end(key)
+        self.hits += 1
+        return data
+
+    async def put(self, key, data: bytes):
+        if not self.enabled or key in self._files:
+            return
+
+        path = self.path_for(key)
+
+        def _write():
+            with open(path + ".part", "wb") as f:
+                f.write(data)
+            os.replace(path + ".part", path)
+
+        try:
+            await asyncio.to_thread(_write)
+        except OSError as e:
+            sublog(f"[stablediffusion] [cache] write failed: {e}", print_console=False)
+            return
+
+        self.stored += 1
+        self._add(key, len(data))
+
+    # -------------------------------
+    # Stats
+    # -------------------------------
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._files),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "evicted": self.evicted,
+        }
+
+
+render_cache = RenderCache()
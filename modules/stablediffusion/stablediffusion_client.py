@@ -0,0 +1,243 @@
+# /app/modules/stablediffusion/stablediffusion_client.py
+
+import json
+import uuid
+import asyncio
+import aiohttp
+
+from core.logging import log, sublog
+
+
+# Polling intervals for wait(): with the event socket up, history is
+# only checked as a safety net; without it, polling takes over.
+SAFETY_POLL = 10.0
+FALLBACK_POLL = 1.0
+
+
+# ============================================================
+# _Job — one prompt waiting for events
+# ============================================================
+class _Job:
+    __slots__ = ("future", "on_progress", "outputs")
+
+    def __init__(self, on_progress=None):
+        self.future = asyncio.get_running_loop().create_future()
+        self.on_progress = on_progress      # callable(value, max, node)
+        self.outputs = {}                   # node id -> output (from "executed")
+
+
+# ============================================================
+# ComfyClient
+#   - one keep-alive aiohttp session per process
+#   - bounded connections to the ComfyUI host
+#   - per-request timeouts; the session is created lazily on
+#     the running loop and closed from the shutdown hook
+#   - one long-lived /ws?clientId= connection; executing /
+#     progress / executed events resolve waiting jobs
+# ============================================================
+class ComfyClient:
+
+    def __init__(self, host="http://127.0.0.1:8188", max_connections=4,
+                 connect_timeout=5.0, request_timeout=60.0):
+        self.host = host.rstrip("/")
+        self.max_connections = max_connections
+        self.connect_timeout = connect_timeout
+        self.request_timeout = request_timeout
+        self.client_id = uuid.uuid4().hex
+        self._session = None
+        self._jobs = {}         # prompt id -> _Job
+        self._ws_task = None
+        self.connected = False
+
+    def configure(self, host=None, max_connections=None, connect_timeout=None, request_timeout=None):
+        if host:
+            self.host = str(host).rstrip("/")
+        if connect_timeout is not None:
+            self.connect_timeout = float(connect_timeout)
+        if request_timeout is not None:
+            self.request_timeout = float(request_timeout)
+        if max_connections is not None and int(max_connections) != self.max_connections:
+            self.max_connections = max(1, int(max_connections))
+            # Connector limits are fixed; the next request opens a new pool
+            if self._session is not None and not self._session.closed:
+                asyncio.ensure_future(self._session.close())
+            self._session = None
+
+    # -------------------------------
+    # Session
+    # -------------------------------
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                keepalive_timeout=60,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(
+                    total=self.request_timeout, connect=self.connect_timeout
+                ),
+            )
+            sublog(f"[stablediffusion] Opened connection pool to {self.host} "
+                   f"(limit {self.max_connections})")
+        return self._session
+
+    async def close(self):
+        self.stop_events()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            sublog("[stablediffusion] Closed connection pool")
+        self._session = None
+
+    # -------------------------------
+    # API
+    # -------------------------------
+    async def post_prompt(self, graph: dict) -> str:
+        payload = {"prompt": graph, "client_id": self.client_id}
+        async with self.session().post(f"{self.host}/prompt", json=payload) as r:
+            if r.status >= 400:
+                # ComfyUI explains validation errors in the body
+                detail = (await r.text())[:300]
+                raise RuntimeError(f"ComfyUI rejected the prompt ({r.status}): {detail}")
+            data = await r.json()
+
+        pid = data.get("prompt_id")
+        if not pid:
+            raise RuntimeError("ComfyUI did not return prompt_id")
+        return pid
+
+    async def history(self, pid: str):
+        """Returns the history entry once it has outputs, else None."""
+        try:
+            async with self.session().get(f"{self.host}/history/{pid}") as r:
+                if r.status != 200:
+                    return None
+                data = await r.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            sublog(f"[stablediffusion] history poll failed: {e}", print_console=False)
+            return None
+
+        entry = data.get(pid)
+        if entry and "outputs" in entry:
+            return entry
+        return None
+
+    async def wait(self, pid: str, timeout=240.0, on_progress=None):
+        """
+        Waits for a prompt to finish and returns its history-shaped
+        entry ({"outputs": {...}}). Completion normally arrives over
+        the event socket; /history is polled as a fallback.
+        """
+        job = _Job(on_progress)
+        self._jobs[pid] = job
+
+        loop = asyncio.get_running_loop()
+        end = loop.time() + timeout
+
+        try:
+            while True:
+                remaining = end - loop.time()
+                if remaining <= 0:
+                    raise TimeoutError("Timed out waiting for ComfyUI.")
+
+                interval = SAFETY_POLL if self.connected else FALLBACK_POLL
+                try:
+                    await asyncio.wait_for(asyncio.shield(job.future), min(interval, remaining))
+                except asyncio.TimeoutError:
+                    # Also covers a prompt that finished before we registered
+                    entry = await self.history(pid)
+                    if entry:
+                        return entry
+                    continue
+
+                if job.outputs:
+                    return {"outputs": job.outputs}
+                # Finished without "executed" events (e.g. fully cached)
+                return await self.history(pid) or {"outputs": {}}
+        finally:
+            self._jobs.pop(pid, None)
+
+    # -------------------------------
+    # Event socket
+    # -------------------------------
+    def start_events(self):
+        if self._ws_task is None or self._ws_task.done():
+            self._ws_task = asyncio.ensure_future(self._listen())
+
+    def stop_events(self):
+        if self._ws_task is not None:
+            self._ws_task.cancel()
+            self._ws_task = None
+        self.connected = False
+
+    async def _listen(self):
+        url = self.host.replace("http", "ws", 1) + f"/ws?clientId={self.client_id}"
+        delay = 1.0
+
+        while True:
+            try:
+                async with self.session().ws_connect(
+                    url, heartbeat=30, timeout=aiohttp.ClientWSTimeout(ws_close=30)
+                ) as ws:
+                    self.connected = True
+                    delay = 1.0
+                    sublog("[stablediffusion] Event socket connected")
+
+                    async for msg in ws:
+                        # Binary frames are latent previews; not used
+                        if msg.type == aiohttp.WSMsgType.TEXT:
+                            self._dispatch(json.loads(msg.data))
+                        elif msg.type == aiohttp.WSMsgType.ERROR:
+                            break
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                sublog(f"[stablediffusion] Event socket error: {e}", print_console=False)
+
+            if self.connected:
+                log("[stablediffusion] Event socket lost; polling until it reconnects")
+            self.connected = False
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+    def _dispatch(self, event: dict):
+        kind = event.get("type")
+        data = event.get("data") or {}
+        job = self._jobs.get(data.get("prompt_id"))
+        if job is None or job.future.done():
+            return
+
+        if kind == "progress":
+            if job.on_progress:
+                try:
+                    job.on_progress(data.get("value", 0), data.get("max", 0), data.get("node"))
+                except Exception as e:
+                    sublog(f"[stablediffusion] progress callback failed: {e}", print_console=False)
+
+        elif kind == "executed":
+            job.outputs[str(data.get("node"))] = data.get("output") or {}
+
+        elif kind == "executing" and data.get("node") is None:
+            job.future.set_result(None)
+
+        elif kind == "execution_error":
+            job.future.set_exception(
+                RuntimeError(f"ComfyUI error in node {data.get('node_id')}: {data.get('exception_message', '').strip()}")
+            )
+
+        elif kind == "execution_interrupted":
+            job.future.set_exception(RuntimeError("ComfyUI execution was interrupted"))
+
+    async def fetch_image(self, image: dict) -> bytes:
+        params = {
+            "filename": image["filename"],
+            "subfolder": image.get("subfolder", ""),
+            "type": image.get("type", "output"),
+        }
+        async with self.session().get(f"{self.host}/view", params=params) as r:
+            r.raise_for_status()
+            return await r.read()
+
+
+client = ComfyClient()
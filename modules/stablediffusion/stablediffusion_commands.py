@@ -1,9 +1,56 @@
 # /app/modules/stablediffusion/stablediffusion_commands.py
 
+import time
+import asyncio
+import contextlib
 import discord
 from discord import app_commands
 
-from .stablediffusion_base import imagine_command
+from .stablediffusion_base import imagine_command, cache_stats
+from .stablediffusion_workflows import workflows
+
+
+# -------------------------------------------------------------
+# Live "step N/M" updates on the placeholder message.
+# Progress events arrive every sampler step; edits are throttled.
+# -------------------------------------------------------------
+PROGRESS_EDIT_INTERVAL = 1.5
+
+
+def progress_reporter(msg):
+    state = {"last": 0.0, "task": None}
+
+    async def _edit(content):
+        try:
+            await msg.edit(content=content)
+        except discord.HTTPException:
+            pass
+
+    def report(value, maximum, title):
+        now = time.monotonic()
+        if now - state["last"] < PROGRESS_EDIT_INTERVAL:
+            return
+        if state["task"] is not None and not state["task"].done():
+            return
+        state["last"] = now
+        label = f"{title} — " if title else ""
+        state["task"] = asyncio.ensure_future(
+            _edit(f"🖼️ Generating image... {label}step {value}/{maximum}")
+        )
+
+    return report
+
+
+def queue_reporter(msg):
+    async def report(pos: int):
+        try:
+            if pos:
+                await msg.edit(content=f"⏳ Waiting in queue — position {pos}")
+            else:
+                await msg.edit(content="🖼️ Generating image...")
+        except discord.HTTPException:
+            pass
+    return report
 
 
 # -------------------------------------------------------------
@@ -20,11 +67,23 @@ def register(bot):
         description="Generate an image using the Stable Diffusion backend."
     )
     @app_commands.describe(
-        prompt="Describe what you want the AI to generate."
+        prompt="Describe what you want the AI to generate.",
+        workflow="Workflow to render with (default from settings).",
+        width="Image width in pixels (rounded to a multiple of 8).",
+        height="Image height in pixels (rounded to a multiple of 8).",
+        steps="Sampling steps; fewer is faster.",
+        seed="Fixed seed for a reproducible image (0 = random).",
+        draft="Fast draft: few steps, refiner off."
     )
     async def imagine_cmd(
         interaction: discord.Interaction,
-        prompt: str
+        prompt: str,
+        workflow: str = None,
+        width: app_commands.Range[int, 64, 2048] = None,
+        height: app_commands.Range[int, 64, 2048] = None,
+        steps: app_commands.Range[int, 1, 150] = None,
+        seed: app_commands.Range[int, 0, 2**53] = None,
+        draft: bool = False
     ):
         # Prevent DM usage (same behavior as other modules)
         if isinstance(interaction.channel, discord.DMChannel):
@@ -41,7 +100,47 @@ def register(bot):
 
         # Try SD pipeline
         try:
-            await imagine_command(interaction, prompt)
-
+            await imagine_command(
+                interaction, prompt,
+                workflow=workflow,
+                width=width, height=height, steps=steps, seed=seed, draft=draft,
+                on_position=queue_reporter(msg),
+                on_progress=progress_reporter(msg),
+            )
         except Exception as e:
-            await msg.edit(content=f"❌ Error: {e}")
+            with contextlib.suppress(discord.HTTPException):
+                await msg.edit(content=f"❌ Error: {e}")
+            return
+
+        # The image is posted as its own message; drop the placeholder
+        with contextlib.suppress(discord.HTTPException):
+            await msg.delete()
+
+    @imagine_cmd.autocomplete("workflow")
+    async def workflow_autocomplete(interaction: discord.Interaction, current: str):
+        return [
+            app_commands.Choice(name=name, value=name)
+            for name in workflows.names()
+            if current.lower() in name.lower()
+        ][:25]
+
+
+    # ==========================================================
+    # /imagine_cache
+    # ==========================================================
+    @bot.tree.command(
+        name="imagine_cache",
+        description="Show render cache and image queue statistics."
+    )
+    async def imagine_cache_cmd(interaction: discord.Interaction):
+        st = cache_stats()
+        q = st["queue"]
+        await interaction.response.send_message(
+            f"🗃️ **Render cache**{'' if st['enabled'] else ' (disabled)'}\n"
+            f"{st['hits']} hits / {st['misses']} misses ({st['hit_rate']:.0%}), "
+            f"{st['entries']} images, {st['bytes'] / 1048576:.0f} / {st['max_bytes'] / 1048576:.0f} MB, "
+            f"{st['evicted']} evicted\n"
+            f"Queue: {q['waiting']} waiting, {q['inflight']} running, "
+            f"{q['images']} images in {q['submissions']} submissions",
+            ephemeral=True
+        )
@@ -0,0 +1,159 @@
+# /app/modules/stablediffusion/stablediffusion_queue.py
+
+import asyncio
+import itertools
+from collections import Counter, deque
+
+from core.logging import sublog
+
+
+class QuotaExceeded(RuntimeError):
+    pass
+
+
+# ============================================================
+# RenderJob — one /imagine request
+# ============================================================
+class RenderJob:
+    __slots__ = ("user_id", "template", "values", "batch_key", "seq",
+                 "future", "on_position", "on_progress", "position")
+
+    def __init__(self, user_id, template, values, batch_key, seq, on_position, on_progress):
+        self.user_id = user_id
+        self.template = template
+        self.values = values
+        self.batch_key = batch_key      # None = never merged with other jobs
+        self.seq = seq
+        self.future = asyncio.get_running_loop().create_future()
+        self.on_position = on_position  # async (pos); 0 = started after waiting
+        self.on_progress = on_progress  # (value, max, node)
+        self.position = 0
+
+
+# ============================================================
+# RenderQueue
+#   - at most max_inflight ComfyUI submissions at a time
+#   - at most max_per_user queued + running jobs per user
+#   - FIFO; waiters are told their position as it changes
+#   - with batching on, waiting jobs that share a batch_key are
+#     merged into one submission of up to max_batch images
+# ============================================================
+class RenderQueue:
+
+    def __init__(self, runner, max_inflight=1, max_per_user=2, batching=False, max_batch=4):
+        # runner(jobs) → list of PNG bytes, one per job, in order
+        self.runner = runner
+        self.max_inflight = max_inflight
+        self.max_per_user = max_per_user
+        self.batching = batching
+        self.max_batch = max_batch
+
+        self._waiting = deque()
+        self._seq = itertools.count()
+        self._inflight = 0
+        self._per_user = Counter()
+        self._tasks = set()
+
+        self.submissions = 0
+        self.images = 0
+
+    def configure(self, max_inflight=None, max_per_user=None, batching=None, max_batch=None):
+        if max_inflight is not None:
+            self.max_inflight = max(1, int(max_inflight))
+        if max_per_user is not None:
+            self.max_per_user = max(1, int(max_per_user))
+        if batching is not None:
+            self.batching = bool(batching)
+        if max_batch is not None:
+            self.max_batch = max(1, int(max_batch))
+
+    # -------------------------------
+    # Dispatch
+    # -------------------------------
+    def _take_batch(self):
+        head = self._waiting.popleft()
+        batch = [head]
+        if self.batching and head.batch_key is not None:
+            for job in list(self._waiting):
+                if len(batch) >= self.max_batch:
+                    break
+                if job.batch_key == head.batch_key:
+                    self._waiting.remove(job)
+                    batch.append(job)
+        return batch
+
+    def _dispatch(self):
+        while self._waiting and self._inflight < self.max_inflight:
+            batch = self._take_batch()
+            self._inflight += 1
+            for job in batch:
+                if job.position:
+                    job.position = 0
+                    self._fire(job.on_position, 0)
+            self._spawn(self._run(batch))
+
+        for pos, job in enumerate(self._waiting, start=1):
+            if job.position != pos:
+                job.position = pos
+                self._fire(job.on_position, pos)
+
+    def _spawn(self, coro):
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _fire(self, callback, pos):
+        if callback:
+            self._spawn(callback(pos))
+
+    async def _run(self, batch):
+        if len(batch) > 1:
+            sublog(f"[stablediffusion] [queue] Rendering batch of {len(batch)}", print_console=False)
+        self.submissions += 1
+        try:
+            images = await self.runner(batch)
+            if len(images) < len(batch):
+                raise RuntimeError(f"ComfyUI returned {len(images)} image(s) for {len(batch)} request(s)")
+            self.images += len(batch)
+            for job, image in zip(batch, images):
+                if not job.future.done():
+                    job.future.set_result(image)
+        except Exception as e:
+            for job in batch:
+                if not job.future.done():
+                    job.future.set_exception(e)
+        finally:
+            self._inflight -= 1
+            self._dispatch()
+
+    # -------------------------------
+    # Public API
+    # -------------------------------
+    async def submit(self, user_id, template, values, batch_key=None,
+                     on_position=None, on_progress=None) -> bytes:
+        if self._per_user[user_id] >= self.max_per_user:
+            raise QuotaExceeded(f"You already have {self._per_user[user_id]} image(s) queued, please wait.")
+
+        job = RenderJob(user_id, template, values, batch_key, next(self._seq), on_position, on_progress)
+        self._per_user[user_id] += 1
+        self._waiting.append(job)
+        self._dispatch()
+
+        try:
+            return await job.future
+        finally:
+            self._per_user[user_id] -= 1
+            if not self._per_user[user_id]:
+                del self._per_user[user_id]
+            if job in self._waiting:
+                # Caller gave up before the job started
+                self._waiting.remove(job)
+                self._dispatch()
+
+    def stats(self) -> dict:
+        return {
+            "waiting": len(self._waiting),
+            "inflight": self._inflight,
+            "submissions": self.submissions,
+            "images": self.images,
+        }
@@ -0,0 +1,125 @@
+# /app/modules/stablediffusion/stablediffusion_workflows.py
+
+import os
+import json
+from pathlib import Path
+
+from core.logging import sublog
+
+
+# ============================================================
+# CONFIG
+# ============================================================
+WORKFLOW_DIR = Path(__file__).parent / "workflows"
+
+# point → candidates in order of preference: (node title or class_type, input).
+# Only literal inputs are patch points; linked inputs ([node, slot])
+# are left to the graph.
+PATCH_POINTS = {
+    "prompt":     (("Main Prompt", "value"), ("PrimitiveStringMultiline", "value")),
+    "seed":       (("Sampler Seed", "value"), ("KSampler", "seed")),
+    "steps":      (("Main KSampler", "steps"), ("KSampler", "steps")),
+    "width":      (("Image Size Settings", "width"), ("EmptyLatentImage", "width")),
+    "height":     (("Image Size Settings", "height"), ("EmptyLatentImage", "height")),
+    "batch_size": (("Image Size Settings", "batch_size"), ("EmptyLatentImage", "batch_size")),
+    "refine":     (("Refine Image?", "value"),),
+}
+
+
+# ============================================================
+# Template — one parsed workflow with its patch points indexed
+# ============================================================
+class Template:
+    __slots__ = ("name", "path", "mtime", "graph", "points", "output")
+
+    def __init__(self, name, path, mtime, graph):
+        self.name = name
+        self.path = path
+        self.mtime = mtime
+        self.graph = graph
+        self.points = self._index(graph)
+        self.output = next(
+            (nid for nid, node in graph.items() if node.get("class_type") == "SaveImage"), None
+        )
+        if self.output is None:
+            raise RuntimeError(f"SaveImage node not found in workflow '{name}'.")
+
+    @staticmethod
+    def _index(graph):
+        def literal(node, key):
+            return key in node.get("inputs", {}) and not isinstance(node["inputs"][key], list)
+
+        by_name = {}
+        for nid, node in graph.items():
+            by_name.setdefault(node.get("_meta", {}).get("title"), []).append(nid)
+            by_name.setdefault(node.get("class_type"), []).append(nid)
+
+        points = {}
+        for point, candidates in PATCH_POINTS.items():
+            points[point] = next(
+                ((nid, key) for name, key in candidates
+                 for nid in by_name.get(name, ()) if literal(graph[nid], key)),
+                None,
+            )
+        return {point: found for point, found in points.items() if found}
+
+    def supports(self, point) -> bool:
+        return point in self.points
+
+    def render(self, **values) -> dict:
+        """
+        Returns a graph for one request. Unpatched nodes are shared
+        with the template; only patched nodes get their own dict.
+        """
+        graph = dict(self.graph)
+        for point, value in values.items():
+            if value is None or point not in self.points:
+                continue
+            nid, key = self.points[point]
+            node = graph[nid]
+            if node is self.graph[nid]:
+                node = dict(node)
+                node["inputs"] = dict(node["inputs"])
+                graph[nid] = node
+            node["inputs"][key] = value
+        return graph
+
+
+# ============================================================
+# WorkflowRegistry — templates cached until the file changes
+# ============================================================
+class WorkflowRegistry:
+
+    def __init__(self, folder=WORKFLOW_DIR):
+        self.folder = Path(folder)
+        self._templates = {}
+
+    def names(self):
+        try:
+            return sorted(p.stem for p in self.folder.glob("*.json"))
+        except OSError:
+            return []
+
+    def get(self, name="default") -> Template:
+        if not name or Path(name).name != name or name.startswith("."):
+            raise FileNotFoundError(f"Workflow not found: {name}")
+
+        path = self.folder / f"{name}.json"
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Workflow not found: {name}") from None
+
+        cached = self._templates.get(name)
+        if cached is not None and cached.mtime == mtime:
+            return cached
+
+        with open(path, "r", encoding="utf-8") as f:
+            template = Template(name, path, mtime, json.load(f))
+        self._templates[name] = template
+        sublog(f"[stablediffusion] Loaded workflow '{name}' "
+               f"(patch points: {', '.join(template.points)})", print_console=False)
+        return template
+
+
+workflows = WorkflowRegistry()
@@ -0,0 +1,49 @@
+# /app/tests/test_config_reload.py
+import configparser
+
+import pytest
+
+from core import config as cfg
+
+
+INI = "[wggbot]\ntoken = secret\n\n[ollama]\nhost = http://127.0.0.1:11434\n"
+
+
+@pytest.fixture
+def ini(tmp_path, monkeypatch):
+    path = tmp_path / "settings.ini"
+    path.write_text(INI)
+    monkeypatch.setattr(cfg, "INI_PATH", str(path))
+    monkeypatch.setattr(cfg, "config", configparser.ConfigParser())
+    monkeypatch.setattr(cfg, "DEBUG", False)
+    monkeypatch.setattr(cfg, "_subscribers", {})
+    cfg.reload()
+    yield path
+    cfg._invalidate()
+
+
+def test_reload_applies_edits(ini):
+    ini.write_text(INI.replace("secret", "rotated"))
+    assert cfg.reload() == ["wggbot"]
+    assert cfg.config["wggbot"]["token"] == "rotated"
+
+
+@pytest.mark.parametrize("damage", ["delete", "empty", "garbage"])
+def test_reload_keeps_config_when_file_is_unusable(ini, damage):
+    seen = []
+    cfg.subscribe("wggbot", lambda section, snap: seen.append(section))
+
+    if damage == "delete":
+        ini.unlink()
+    elif damage == "empty":
+        ini.write_text("")
+    else:
+        ini.write_text("token = half-writ")
+
+    assert cfg.reload() == []
+    assert sorted(cfg.config.sections()) == ["ollama", "wggbot"]
+    assert cfg.config["wggbot"]["token"] == "secret"
+    assert seen == []
+
+    # Recorded, so the watcher does not retry it every poll
+    assert cfg._loaded_mtime == cfg._ini_mtime()
@@ -0,0 +1,47 @@
+# /app/tests/test_disk_lru.py
+import os
+
+from core.disk_lru import DiskLRU
+
+
+class _Cache(DiskLRU):
+    suffix = ".bin"
+
+
+def _write(folder, name, size, mtime):
+    path = folder / name
+    path.write_bytes(b"x" * size)
+    os.utime(path, (mtime, mtime))
+
+
+def test_open_indexes_oldest_first_and_trims(tmp_path):
+    _write(tmp_path, "old.bin", 10, 1000)
+    _write(tmp_path, "new.bin", 10, 2000)
+    _write(tmp_path, "half.bin.part", 5, 3000)
+    _write(tmp_path, "other.txt", 5, 3000)
+
+    cache = _Cache(str(tmp_path), enabled=True, max_bytes=15)
+    assert cache.open()
+
+    assert list(cache._files) == ["new"]
+    assert not (tmp_path / "old.bin").exists()
+    assert not (tmp_path / "half.bin.part").exists()
+    assert (tmp_path / "other.txt").exists()
+    assert cache.evicted == 1
+
+
+def test_add_evicts_least_recently_used(tmp_path):
+    cache = _Cache(str(tmp_path), enabled=True, max_bytes=20)
+    cache.open()
+    for key in ("a", "b", "c"):
+        _write(tmp_path, f"{key}.bin", 10, 1000)
+        cache._add(key, 10)
+
+    assert list(cache._files) == ["b", "c"]
+    assert cache._bytes == 20
+
+
+def test_disabled_cache_does_not_touch_disk(tmp_path):
+    cache = _Cache(str(tmp_path / "missing"), enabled=False)
+    assert not cache.open()
+    assert not (tmp_path / "missing").exists()
@@ -0,0 +1,41 @@
+# /app/tests/test_ollama_cache.py
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from modules.ollama import ollama_base
+from modules.ollama.ollama_cache import ResponseCache
+
+
+OPTIONS = {"temperature": 0}
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = ResponseCache()
+    monkeypatch.setattr(ollama_base, "cache", cache)
+    yield cache
+    ollama_base.memory.reset("channel")
+
+
+def test_first_turn_with_memory_hits_cache(cache):
+    async def run():
+        key = ollama_base._cache_key("m", "hello", OPTIONS)
+        await cache.put(key, "m", "cached reply")
+        return await ollama_base.ask_ollama("hello", "m", OPTIONS, session_key="channel")
+
+    assert asyncio.run(run()) == "cached reply"
+    assert cache.stats()["hits"] == 1
+
+    # The hit is still remembered as the conversation's first turn
+    convo = ollama_base.memory.get("channel", "m")
+    assert [t.reply for t in convo.turns] == ["cached reply"]
+
+
+def test_later_turns_bypass_cache(cache):
+    convo = ollama_base.memory.get("channel", "m")
+    ollama_base.memory.record(convo, "earlier", "answer", None)
+
+    assert ollama_base._turn_cache_key(convo, "m", "hello", OPTIONS) is None
@@ -0,0 +1,51 @@
+# /app/tests/test_ollama_cache_db.py
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from modules.ollama import ollama_cache
+from modules.ollama.ollama_cache import ResponseCache
+
+
+async def _rows(cache):
+    async with cache._db.execute("SELECT key FROM responses ORDER BY created") as cur:
+        rows = []
+        while (row := await cur.fetchone()) is not None:
+            rows.append(row[0])
+        return rows
+
+
+def test_db_tier_is_pruned_by_size_on_put(tmp_path, monkeypatch):
+    monkeypatch.setattr(ollama_cache, "DB_PRUNE_INTERVAL", 0)
+
+    async def run():
+        cache = ResponseCache(db_path=str(tmp_path / "cache.sqlite"), db_max_bytes=25)
+        await cache.open()
+        try:
+            for key in ("a", "b", "c"):
+                await cache.put(key, "m", "x" * 10)
+            return await _rows(cache)
+        finally:
+            await cache.close()
+
+    assert asyncio.run(run()) == ["b", "c"]
+
+
+def test_db_tier_drops_expired_rows_on_put(tmp_path, monkeypatch):
+    monkeypatch.setattr(ollama_cache, "DB_PRUNE_INTERVAL", 0)
+
+    async def run():
+        cache = ResponseCache(db_path=str(tmp_path / "cache.sqlite"), ttl=60)
+        await cache.open()
+        try:
+            await cache._db.execute(
+                "INSERT INTO responses (key, model, reply, created) VALUES ('old', 'm', 'x', 0)"
+            )
+            await cache.put("new", "m", "y")
+            return await _rows(cache)
+        finally:
+            await cache.close()
+
+    assert asyncio.run(run()) == ["new"]
@@ -0,0 +1,28 @@
+# /app/tests/test_ollama_hosts.py
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from modules.ollama.ollama_hosts import HostPool
+
+
+def test_pick_spreads_past_a_full_host():
+    pool = HostPool(["http://h1", "http://h2"])
+    h1, h2 = pool.hosts.values()
+    h1.loaded = {"llama3"}
+
+    first = pool.pick("llama3", max_outstanding=1)
+    pool.begin(first)
+    second = pool.pick("llama3", max_outstanding=1)
+
+    assert first is h1
+    assert second is h2
+
+
+def test_pick_without_limit_prefers_loaded_host():
+    pool = HostPool(["http://h1", "http://h2"])
+    h1, _ = pool.hosts.values()
+    h1.loaded = {"llama3"}
+    pool.begin(h1)
+
+    assert pool.pick("llama3") is h1
@@ -0,0 +1,68 @@
+# /app/tests/test_ollama_scheduler.py
+import asyncio
+
+from modules.ollama.ollama_scheduler import Scheduler
+
+
+async def _run_pair(scheduler, model="llama3"):
+    """Starts two same-model requests; returns how many ran at once."""
+    running = 0
+    peak = 0
+    release = asyncio.Event()
+
+    async def request(user_id):
+        nonlocal running, peak
+        async with scheduler.slot(model, user_id=user_id):
+            running += 1
+            peak = max(peak, running)
+            await release.wait()
+            running -= 1
+
+    tasks = [asyncio.ensure_future(request(u)) for u in (1, 2)]
+    await asyncio.sleep(0.01)
+    granted = peak
+    release.set()
+    await asyncio.gather(*tasks)
+    return granted
+
+
+def test_same_model_runs_on_two_hosts_at_once():
+    scheduler = Scheduler(max_per_model=1, max_per_host=1, hosts=2)
+    assert asyncio.run(_run_pair(scheduler)) == 2
+
+
+def test_same_model_follows_hosts_that_serve_it():
+    scheduler = Scheduler(max_per_model=1, max_per_host=1, hosts=2,
+                          model_hosts=lambda model: 1)
+    assert asyncio.run(_run_pair(scheduler)) == 1
+
+
+def test_single_host_keeps_per_model_cap():
+    scheduler = Scheduler(max_per_model=1, max_per_host=2, hosts=1)
+    assert asyncio.run(_run_pair(scheduler)) == 1
+
+
+def test_raised_limits_release_waiters():
+    async def run():
+        scheduler = Scheduler(max_per_model=1, max_per_host=1, hosts=1)
+        release = asyncio.Event()
+        started = []
+
+        async def request(user_id):
+            async with scheduler.slot("llama3", user_id=user_id):
+                started.append(user_id)
+                await release.wait()
+
+        tasks = [asyncio.ensure_future(request(u)) for u in (1, 2)]
+        await asyncio.sleep(0.01)
+        assert started == [1]
+
+        # A health check finding a second host must not wait for a release
+        scheduler.configure(hosts=2)
+        await asyncio.sleep(0.01)
+        assert started == [1, 2]
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())